@@ -0,0 +1,60 @@
+"""Portfolio indexes and BIGINT user ids
+
+Revision ID: 5c1d9f3b7a21
+Revises: 0a884230e10b
+Create Date: 2026-10-17 12:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1d9f3b7a21'
+down_revision: Union[str, Sequence[str], None] = '0a884230e10b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Telegram ids no longer fit into a 32-bit integer
+    op.alter_column('portfolio_items', 'user_id', type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=False)
+    op.alter_column('users', 'user_id', type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=False)
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        # Public browsing of a category: count + seek by id among approved projects
+        op.create_index(
+            'ix_portfolio_items_approved_category_id', 'portfolio_items', ['category_id', 'id'],
+            postgresql_where=sa.text('is_approved'), postgresql_concurrently=True, if_not_exists=True
+        )
+        # "All Projects" browsing
+        op.create_index(
+            'ix_portfolio_items_approved_id', 'portfolio_items', ['id'],
+            postgresql_where=sa.text('is_approved'), postgresql_concurrently=True, if_not_exists=True
+        )
+        # Moderation queue: count + seek by id among pending projects
+        op.create_index(
+            'ix_portfolio_items_pending_id', 'portfolio_items', ['id'],
+            postgresql_where=sa.text('NOT is_approved'), postgresql_concurrently=True, if_not_exists=True
+        )
+        # Foreign key to users.user_id (projects of a submitter, deletes of users)
+        op.create_index(
+            'ix_portfolio_items_user_id', 'portfolio_items', ['user_id'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_portfolio_items_user_id', table_name='portfolio_items', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_portfolio_items_pending_id', table_name='portfolio_items', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_portfolio_items_approved_id', table_name='portfolio_items', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_portfolio_items_approved_category_id', table_name='portfolio_items', postgresql_concurrently=True, if_exists=True)
+
+    op.alter_column('users', 'user_id', type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=False)
+    op.alter_column('portfolio_items', 'user_id', type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=False)
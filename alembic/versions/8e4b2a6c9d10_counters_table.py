@@ -0,0 +1,44 @@
+"""Counters table
+
+Revision ID: 8e4b2a6c9d10
+Revises: 5c1d9f3b7a21
+Create Date: 2026-10-17 13:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4b2a6c9d10'
+down_revision: Union[str, Sequence[str], None] = '5c1d9f3b7a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('counters',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    # Initial values; afterwards they are maintained by the handlers and reconciled periodically
+    op.execute("""
+        INSERT INTO counters (name, value)
+        SELECT 'users', count(*) FROM users
+        UNION ALL
+        SELECT CASE WHEN is_approved THEN 'approved:' ELSE 'pending:' END || category_id, count(*)
+        FROM portfolio_items GROUP BY is_approved, category_id
+        UNION ALL
+        SELECT CASE WHEN is_approved THEN 'approved:0' ELSE 'pending:0' END, count(*)
+        FROM portfolio_items GROUP BY is_approved
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('counters')
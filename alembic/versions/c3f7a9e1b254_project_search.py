@@ -0,0 +1,62 @@
+"""Project search: tsvector column, GIN and trigram indexes
+
+Revision ID: c3f7a9e1b254
+Revises: 8e4b2a6c9d10
+Create Date: 2026-10-17 14:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f7a9e1b254'
+down_revision: Union[str, Sequence[str], None] = '8e4b2a6c9d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must stay in sync with SEARCH_VECTOR_SQL in src/database/models.py
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Generated column: Postgres keeps it up to date on every INSERT/UPDATE of title/description.
+    # Adding a STORED generated column rewrites the table once.
+    op.add_column('portfolio_items', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed(SEARCH_VECTOR_SQL, persisted=True), nullable=True
+    ))
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        # Full-text search among approved projects: search_vector @@ websearch_to_tsquery(...)
+        op.create_index(
+            'ix_portfolio_items_search_vector', 'portfolio_items', ['search_vector'],
+            postgresql_using='gin', postgresql_where=sa.text('is_approved'),
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # Fuzzy fallback by title: title % :query
+        op.create_index(
+            'ix_portfolio_items_title_trgm', 'portfolio_items', ['title'],
+            postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'},
+            postgresql_where=sa.text('is_approved'),
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_portfolio_items_title_trgm', table_name='portfolio_items', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_portfolio_items_search_vector', table_name='portfolio_items', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_column('portfolio_items', 'search_vector')
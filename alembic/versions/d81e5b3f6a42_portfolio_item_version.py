@@ -0,0 +1,30 @@
+"""Portfolio item version
+
+Revision ID: d81e5b3f6a42
+Revises: c3f7a9e1b254
+Create Date: 2026-10-17 15:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81e5b3f6a42'
+down_revision: Union[str, Sequence[str], None] = 'c3f7a9e1b254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bumped on every change of a project; part of the card render cache key.
+    # A constant server default does not rewrite the table (PostgreSQL 11+).
+    op.add_column('portfolio_items', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('portfolio_items', 'version')
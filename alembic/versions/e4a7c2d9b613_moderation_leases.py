@@ -0,0 +1,36 @@
+"""Moderation leases and created_at
+
+Revision ID: e4a7c2d9b613
+Revises: d81e5b3f6a42
+Create Date: 2026-10-17 16:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c2d9b613'
+down_revision: Union[str, Sequence[str], None] = 'd81e5b3f6a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Moderator who currently holds the pending project and until when
+    op.add_column('portfolio_items', sa.Column('lease_owner', sa.BigInteger(), nullable=True))
+    op.add_column('portfolio_items', sa.Column('lease_until', sa.DateTime(timezone=True), nullable=True))
+    # Queue age; now() is stable, so existing rows get the migration time without a table rewrite
+    op.add_column('portfolio_items', sa.Column(
+        'created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('portfolio_items', 'created_at')
+    op.drop_column('portfolio_items', 'lease_until')
+    op.drop_column('portfolio_items', 'lease_owner')
@@ -1,12 +1,14 @@
 # main.py
 import asyncio
 import logging
+import multiprocessing
+import os
+import signal
 import sys
 
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.redis import RedisStorage
 from redis.asyncio import Redis
 
 # 1. (ИЗМЕНЕНО) Импортируем 'settings' из нового config.py
@@ -21,6 +23,24 @@ from src.database.setup import (
     engine  # <--- ДОБАВЬ ЭТОТ ИМПОРТ (из твоего файла сессии/setup)
 )
 from src.handlers.user_handlers import router, admin_router
+from src.services.category_cache import CategoryCache
+from src.database.counters import run_counters_reconciler
+from src.database.moderation import run_moderation_queue_stats
+from src.services.user_buffer import UserRegistrationBuffer
+from src.web.webhook import run_webhook_server, set_webhook
+from src.middlewares.concurrency import ConcurrencyLimitMiddleware
+from src.middlewares.db_session import DbSessionMiddleware
+from src.middlewares.admin_check import RoleMiddleware
+from src.services.notifier import NotificationQueue
+from src.services.inline_results import InlineResultsCache
+from src.services.card_cache import CardRenderCache
+from src.services.browse_snapshot import BrowseSnapshots
+from src.services.fsm_storage import create_fsm_storage, create_event_isolation, run_fsm_stats
+from src.services.redis_pool import create_redis
+from src.services.role_cache import RoleCache
+from src.middlewares.metrics import TelegramApiMetricsMiddleware
+from src.middlewares.query_accounting import QueryAccountingMiddleware
+from src.web.metrics import start_metrics_server
 
 # Настройка логирования
 logging.basicConfig(
@@ -30,9 +50,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-async def main():
-    logger.info("Starting bot configuration...")
-    
+
+async def prepare_database(redis_client: Redis | None = None):
+    """Однократная подготовка БД перед запуском (в главном процессе)."""
     # 1. Инициализация Базы Данных
     await init_db()
     logger.info("Database initialized.")
@@ -43,54 +63,263 @@ async def main():
     logger.info(f"Admin user {settings.ADMIN_ID} checked.")
     
     # 3. Добавление стандартных категорий
-    await ensure_default_categories(AsyncSessionLocal)
+    if await ensure_default_categories(AsyncSessionLocal):
+        # Категории изменились - сбрасываем общую копию кэша в Redis
+        cache_redis = redis_client or create_redis()
+        await CategoryCache(cache_redis, AsyncSessionLocal).invalidate()
+        if redis_client is None:
+            await cache_redis.aclose()
     logger.info("Default categories checked.")
-    
-    # 4. Инициализация Redis для FSM
-    # (ДОБАВЛЕНО)
-    redis_client = Redis(host="redis", port=6379) # 'redis' - это имя сервиса из docker-compose
-    storage = RedisStorage(redis=redis_client)
-    logger.info("Redis storage initialized.")
-    
-    # 5. Инициализация Бота
+
+
+def create_bot() -> Bot:
     # (ИЗМЕНЕНО) Используем settings.get_bot_token()
     bot = Bot(
         token=settings.get_bot_token(), 
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
+    # Латентность и ошибки каждого запроса к Bot API
+    bot.session.middleware(TelegramApiMetricsMiddleware())
+    return bot
+
+
+def create_dispatcher(is_leader: bool = True, redis_client: Redis | None = None) -> Dispatcher:
+    """
+    Собирает Диспетчер и все зависимости хэндлеров одного процесса.
+    is_leader - процесс, который запускает фоновые задачи (сверка счетчиков);
+    в webhook-режиме с несколькими воркерами это только воркер #0.
+    redis_client - готовый клиент Redis (например, для бенчмарка), по умолчанию создается новый.
+    """
+    # 4. Один клиент Redis на процесс: его пул общий для FSM, кэшей и очереди уведомлений
+    redis_client = redis_client or create_redis()
+    # Компактная сериализация (orjson) и TTL для брошенных сценариев
+    storage = create_fsm_storage(redis_client)
     
-    # 6. Инициализация Диспетчера
+    # 5. Инициализация Диспетчера
     # (ИЗМЕНЕНО) Передаем storage (Redis) в Диспетчер
-    dp = Dispatcher(storage=storage)
+    # events_isolation: апдейты одного чата по очереди во всех процессах (замок до чтения состояния FSM)
+    dp = Dispatcher(storage=storage, events_isolation=create_event_isolation(redis_client))
+    
+    # 6. Параллельная обработка апдейтов с общим лимитом
+    concurrency = ConcurrencyLimitMiddleware(settings.UPDATE_CONCURRENCY_LIMIT)
+    dp.update.outer_middleware(concurrency)
+    # Количество SQL-запросов и время в БД на каждый апдейт
+    dp.update.outer_middleware(QueryAccountingMiddleware(
+        log_level=logging.INFO if settings.SQL_LOG_PER_UPDATE else logging.DEBUG
+    ))
+    # Одна ленивая сессия БД на апдейт (аргумент хэндлера `session`)
+    dp.update.outer_middleware(DbSessionMiddleware(AsyncSessionLocal))
+    # Роль пользователя из кэша в памяти (аргумент хэндлера `is_admin`)
+    role_cache = RoleCache(redis_client, AsyncSessionLocal, refresh_interval=settings.ROLE_CACHE_REFRESH_INTERVAL)
+    dp.update.outer_middleware(RoleMiddleware(role_cache))
     
     # 7. Регистрация роутеров
     dp.include_router(admin_router)
     dp.include_router(router)
+    
+    # 8. Зависимости, которые aiogram передает в хэндлеры по имени аргумента
+    category_cache = CategoryCache(redis_client, AsyncSessionLocal)
+    dp.workflow_data.update(
+        category_cache=category_cache,
+        role_cache=role_cache,
+        card_cache=CardRenderCache(settings.CARD_CACHE_SIZE),
+        browse_snapshots=BrowseSnapshots(
+            redis_client,
+            AsyncSessionLocal,
+            ttl=settings.BROWSE_SNAPSHOT_TTL,
+            size=settings.BROWSE_SNAPSHOT_SIZE,
+            prefetch=settings.BROWSE_PREFETCH,
+            item_ttl=settings.BROWSE_ITEM_TTL
+        ),
+        inline_results=InlineResultsCache(
+            redis_client,
+            AsyncSessionLocal,
+            category_cache,
+            set_size=settings.INLINE_RESULT_SET_SIZE,
+            ttl=settings.INLINE_RESULTS_TTL,
+            popular_limit=settings.INLINE_POPULAR_QUERIES
+        ),
+        user_buffer=UserRegistrationBuffer(
+            AsyncSessionLocal,
+            flush_interval=settings.USER_BUFFER_FLUSH_INTERVAL_MS / 1000,
+            max_batch=settings.USER_BUFFER_MAX_BATCH,
+            max_retries=settings.USER_BUFFER_MAX_RETRIES
+        ),
+        notifier=NotificationQueue(
+            redis_client,
+            global_rate=settings.NOTIFY_GLOBAL_RATE,
+            per_chat_rate=settings.NOTIFY_PER_CHAT_RATE,
+            max_attempts=settings.NOTIFY_MAX_ATTEMPTS,
+            concurrency=settings.NOTIFY_CONCURRENCY
+        ),
+        is_leader=is_leader,
+        concurrency=concurrency,
+    )
+    dp.startup.register(on_startup)
+    return dp
+
+
+async def on_startup(dispatcher: Dispatcher, bot: Bot, user_buffer: UserRegistrationBuffer, notifier: NotificationQueue, inline_results: InlineResultsCache, role_cache: RoleCache, is_leader: bool, concurrency: ConcurrencyLimitMiddleware):
+    """Запуск фоновых задач процесса."""
+    user_buffer.start()
+    
+    # Роли нужны до первого апдейта; дальше их обновляет подписка на Redis (в каждом процессе)
+    await role_cache.load()
+    background_tasks = [asyncio.create_task(role_cache.listen())]
+    if settings.UPDATE_STATS_LOG_INTERVAL:
+        background_tasks.append(asyncio.create_task(concurrency.log_stats(settings.UPDATE_STATS_LOG_INTERVAL)))
+    if is_leader:
+        # Уведомления отправляет один процесс: так соблюдается общий лимит Telegram
+        await notifier.start(bot)
+        # Периодическая сверка денормализованных счетчиков
+        background_tasks.append(asyncio.create_task(
+            run_counters_reconciler(AsyncSessionLocal, settings.COUNTERS_RECONCILE_INTERVAL)
+        ))
+        # Размер FSM в Redis (ключи и байты)
+        if settings.FSM_STATS_INTERVAL:
+            background_tasks.append(asyncio.create_task(
+                run_fsm_stats(dispatcher.storage.redis, settings.FSM_STATS_INTERVAL)
+            ))
+        # Глубина и возраст очереди модерации
+        if settings.MODERATION_STATS_INTERVAL:
+            background_tasks.append(asyncio.create_task(
+                run_moderation_queue_stats(AsyncSessionLocal, settings.MODERATION_STATS_INTERVAL)
+            ))
+        # Наборы результатов inline-режима для категорий и популярных запросов
+        background_tasks.append(asyncio.create_task(
+            inline_results.run_precompute(settings.INLINE_PRECOMPUTE_INTERVAL)
+        ))
+    dispatcher["background_tasks"] = background_tasks
+
+
+async def shutdown_resources(dispatcher: Dispatcher):
+    """Корректное закрытие ресурсов процесса."""
+    logger.info("Stopping bot...")
+    for task in dispatcher.workflow_data.get("background_tasks", []):
+        task.cancel()
+    await dispatcher["notifier"].stop()     # Неотправленное остается в Redis до следующего запуска
+    await dispatcher["user_buffer"].stop()  # Сбрасываем в БД накопленные регистрации
+    # Корректно закрываем соединения
+    await dispatcher.storage.close()  # Закрывает соединение с Redis
+    await engine.dispose()            # Закрывает пул соединений с PostgreSQL
+    logger.info("Bot stopped.")
+
+
+async def run_polling():
+    """Режим Long Polling (для разработки)."""
+    logger.info("Starting bot configuration...")
+    await prepare_database()
+    
+    bot = create_bot()
+    dp = create_dispatcher()
     logger.info("Routers included.")
     
-    # 8. Запуск бота
     logger.info("Starting bot in Long Polling mode...")
-    await bot.delete_webhook(drop_pending_updates=True)
+    await bot.delete_webhook(drop_pending_updates=settings.DROP_PENDING_UPDATES)
+    
+    metrics_runner = await start_metrics_server() if settings.METRICS_ENABLED else None
     
     # (ДОБАВЛЕНО) Блок try...finally для корректного закрытия ресурсов
     try:
-        # Передаем сессию БД (как у тебя и было)
-        await dp.start_polling(
-            bot,
-            session_maker=AsyncSessionLocal
-        )
+        # handle_as_tasks: каждый апдейт - отдельная задача, лимит задает ConcurrencyLimitMiddleware
+        await dp.start_polling(bot, handle_as_tasks=True)
     finally:
-        logger.info("Stopping bot...")
-        # Корректно закрываем соединения
-        await dp.storage.close()  # Закрывает соединение с Redis
+        await shutdown_resources(dp)
         await bot.session.close()
-        await engine.dispose()    # Закрывает пул соединений с PostgreSQL
-        logger.info("Bot stopped.")
+        if metrics_runner:
+            await metrics_runner.cleanup()
+
+
+def run_webhook_worker(worker_index: int, serve_metrics: bool = False, supervised: bool = False):
+    """
+    Один процесс-воркер webhook-сервера (все воркеры слушают один порт).
+    supervised - воркер запущен родительским процессом: своя группа процессов, чтобы Ctrl+C
+    из терминала не приходил воркеру вторым сигналом - остановку пересылает родитель.
+    """
+    if supervised:
+        os.setpgrp()
+    bot = create_bot()
+    dp = create_dispatcher(is_leader=worker_index == 0)
+    # В webhook-режиме aiohttp сам вызывает shutdown Диспетчера при остановке сервера
+    dp.shutdown.register(shutdown_resources)
+    if worker_index == 0:
+        # Webhook регистрирует только один воркер
+        dp.startup.register(set_webhook)
+    logger.info(f"Webhook worker #{worker_index} started.")
+    run_webhook_server(bot, dp, serve_metrics=serve_metrics)
+
+
+async def supervise_webhook_workers(workers: list):
+    """
+    Родительский процесс: отдает агрегированные метрики воркеров и ждет их завершения.
+    SIGTERM/SIGINT (docker stop, Ctrl+C) пересылается воркерам как SIGTERM: aiohttp
+    останавливается корректно и вызывает shutdown_resources (сброс буфера регистраций и т.д.).
+    Воркеры, не успевшие за WEB_SHUTDOWN_TIMEOUT, завершаются принудительно.
+    """
+    loop = asyncio.get_running_loop()
+
+    def kill_stragglers():
+        for worker in workers:
+            if worker.is_alive():
+                logger.warning(f"{worker.name} did not stop in {settings.WEB_SHUTDOWN_TIMEOUT}s, killing it.")
+                worker.kill()
+
+    def stop_workers(signum: int):
+        for handled in (signal.SIGTERM, signal.SIGINT):
+            # Повторный сигнал не перезапускает остановку
+            loop.remove_signal_handler(handled)
+        logger.info(f"Received {signal.Signals(signum).name}, stopping webhook workers...")
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        loop.call_later(settings.WEB_SHUTDOWN_TIMEOUT, kill_stragglers)
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop_workers, signum)
+
+    if settings.METRICS_ENABLED and not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set: metrics of webhook workers will not be collected.")
+    metrics_runner = await start_metrics_server() if settings.METRICS_ENABLED else None
+    try:
+        await asyncio.gather(*(asyncio.to_thread(worker.join) for worker in workers))
+    finally:
+        if metrics_runner:
+            await metrics_runner.cleanup()
+
+
+def run_webhook():
+    """Режим Webhook: Telegram сам присылает апдейты, воркеры обрабатывают их параллельно."""
+    logger.info("Starting bot configuration...")
+    
+    async def prepare():
+        await prepare_database()
+        await engine.dispose()  # Воркеры создадут свои пулы соединений в своих event loop
+    
+    asyncio.run(prepare())
+    
+    if settings.WEB_WORKERS <= 1:
+        run_webhook_worker(0, serve_metrics=settings.METRICS_ENABLED)
+        return
+    
+    # spawn: каждый воркер создает свои event loop, пулы БД и Redis с нуля
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=run_webhook_worker, args=(i, False, True), name=f"webhook-worker-{i}") for i in range(settings.WEB_WORKERS)]
+    for worker in workers:
+        worker.start()
+    asyncio.run(supervise_webhook_workers(workers))
+
+
+def main():
+    if settings.BOT_MODE == "webhook":
+        run_webhook()
+    else:
+        asyncio.run(run_polling())
+
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        main()
     except KeyboardInterrupt:
         logger.info("Bot stopped manually (KeyboardInterrupt).")
     except Exception as e:
-        logger.critical(f"An unexpected error occurred: {e}", exc_info=True)
\ No newline at end of file
+        logger.critical(f"An unexpected error occurred: {e}", exc_info=True)
@@ -3,11 +3,16 @@ from aiogram.filters.callback_data import CallbackData
 
 class ProjectCallback(CallbackData, prefix="proj"):
     """Callback-фабрика для навигации и управления проектами."""
-    action: str  # 'next', 'prev', 'delete', 'approve', 'reject'
+    action: str  # 'next', 'prev', 'mod_next', 'search_next', 'search_prev', 'get_doc', 'delete', 'approve', 'reject'
     item_id: int # ID проекта
     current_index: int # Текущий индекс в списке для навигации
     category_id: int # ID текущей категории (0 для "Все")
 
 class CategoryCallback(CallbackData, prefix="cat"):
     """Callback-фабрика для выбора категории."""
-    category_id: int # ID категории (0 для "Показать все")
\ No newline at end of file
+    category_id: int # ID категории (0 для "Показать все")
+
+class BulkModerationCallback(CallbackData, prefix="bulk"):
+    """Callback-фабрика для массовой модерации."""
+    action: str # 'select', 'approve', 'reject', 'cancel'
+    category_id: int = 0 # Фильтр по категории (0 - все категории)
\ No newline at end of file
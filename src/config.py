@@ -1,4 +1,7 @@
 # src/config.py
+import hashlib
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import SecretStr, Field
 
@@ -22,9 +25,101 @@ class Settings(BaseSettings):
     BOT_TOKEN: SecretStr
     ADMIN_ID: int
 
+    # --- Режим получения апдейтов ---
+    # 'polling' - для разработки, 'webhook' - для продакшена (горизонтальное масштабирование)
+    BOT_MODE: Literal["polling", "webhook"] = "polling"
+    # Сбрасывать ли накопившиеся апдейты при запуске
+    DROP_PENDING_UPDATES: bool = False
+
+    # --- Webhook (используется при BOT_MODE=webhook) ---
+    WEBHOOK_BASE_URL: str | None = None        # Публичный HTTPS-адрес, например https://bot.example.com
+    WEBHOOK_PATH: str = "/webhook"
+    WEBHOOK_SECRET: SecretStr | None = None    # Если не задан - выводится из токена бота
+    WEB_SERVER_HOST: str = "0.0.0.0"
+    WEB_SERVER_PORT: int = 8080
+    WEB_WORKERS: int = 1                       # Количество процессов-воркеров на одном порту
+    WEB_SHUTDOWN_TIMEOUT: float = 30.0         # Сколько ждать корректной остановки воркеров после SIGTERM, секунды
+
+    # --- Параллельная обработка апдейтов ---
+    UPDATE_CONCURRENCY_LIMIT: int = 100  # Максимум одновременно обрабатываемых апдейтов в процессе
+    UPDATE_STATS_LOG_INTERVAL: int = 60  # Как часто писать метрики очереди в лог (секунды, 0 - не писать)
+
+    # --- Метрики Prometheus ---
+    METRICS_ENABLED: bool = True
+    METRICS_PATH: str = "/metrics"
+    # Отдельный сервер метрик в обоих режимах (не публичный порт webhook);
+    # с несколькими webhook-воркерами его поднимает родительский процесс
+    METRICS_HOST: str = "0.0.0.0"
+    METRICS_PORT: int = 9100
+
+    # --- Пул соединений PostgreSQL ---
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10             # Постоянные соединения (на процесс)
+    DB_MAX_OVERFLOW: int = 10          # Дополнительные соединения при пиковой нагрузке
+    DB_POOL_TIMEOUT: float = 30.0      # Сколько ждать свободное соединение, секунды
+    DB_POOL_RECYCLE: int = 1800        # Пересоздавать соединения старше N секунд
+    DB_POOL_PRE_PING: bool = True      # Проверять соединение перед выдачей из пула
+    DB_STATEMENT_CACHE_SIZE: int = 500 # Кэш prepared statements asyncpg (0 - режим pgbouncer: кэши выключены, имена statements уникальны)
+    DB_STATEMENT_TIMEOUT_MS: int = 5000 # statement_timeout на стороне сервера (0 - без ограничения; в режиме pgbouncer не передается - ALTER ROLE ... SET statement_timeout)
+
+    # --- Учет SQL-запросов ---
+    SLOW_QUERY_THRESHOLD_MS: int = 200 # Запросы дольше порога пишутся в лог с SQL и хэндлером
+    SQL_LOG_PER_UPDATE: bool = False   # Писать ли в лог (INFO) число запросов и время в БД на каждый апдейт
+
+    # --- Очередь уведомлений пользователям ---
+    NOTIFY_GLOBAL_RATE: float = 25.0   # Сообщений в секунду на всего бота (лимит Telegram ~30)
+    NOTIFY_PER_CHAT_RATE: float = 1.0  # Сообщений в секунду в один чат
+    NOTIFY_MAX_ATTEMPTS: int = 5       # Повторов при сетевых ошибках
+    NOTIFY_CONCURRENCY: int = 10       # Одновременных запросов sendMessage
+
+    # --- Массовая модерация ---
+    BULK_MODERATION_LIMIT: int = 500   # Максимум проектов в одной пачке
+
+    # --- Очередь модерации ---
+    MODERATION_LEASE_SECONDS: int = 300     # На сколько проект закрепляется за модератором, открывшим его
+    MODERATION_STATS_INTERVAL: int = 60     # Как часто обновлять метрики очереди (0 - не обновлять)
+
+    # --- Роли ---
+    ROLE_CACHE_REFRESH_INTERVAL: int = 300  # Перечитывать администраторов из БД не реже, чем раз в N секунд
+
+    # --- Кэш отрисованных карточек ---
+    CARD_CACHE_SIZE: int = 5000        # Карточек в LRU-кэше процесса
+
+    # --- Снимки просмотра категорий ---
+    BROWSE_SNAPSHOT_TTL: int = 600     # Сколько живет снимок id категории для пользователя, секунды
+    BROWSE_SNAPSHOT_SIZE: int = 2000   # Максимум id в снимке (дальше - seek-запрос по курсору)
+    BROWSE_PREFETCH: int = 3           # Сколько следующих карточек прогревать в кэше
+    BROWSE_ITEM_TTL: int = 300         # Время жизни кэша полей проекта, секунды
+
+    # --- Поиск ---
+    SEARCH_MAX_RESULTS: int = 50       # Сколько результатов /search листается в карточках
+
+    # --- Inline-режим ---
+    INLINE_CACHE_TIME: int = 300           # cache_time ответа: сколько Telegram кэширует результаты у себя, секунды
+    INLINE_RESULT_SET_SIZE: int = 50       # Результатов в наборе (максимум Bot API на один ответ - 50)
+    INLINE_RESULTS_TTL: int = 900          # Время жизни набора в Redis, секунды
+    INLINE_PRECOMPUTE_INTERVAL: int = 300  # Как часто пересчитывать наборы категорий и популярных запросов
+    INLINE_POPULAR_QUERIES: int = 100      # Сколько популярных запросов пересчитывать заранее
+
     # --- Redis (для FSM) ---
     REDIS_HOST: str
     REDIS_PORT: int
+    REDIS_DB: int = 0
+    REDIS_PASSWORD: SecretStr | None = None
+
+    # --- Пул соединений Redis (один на процесс: FSM, кэши, очереди) ---
+    REDIS_MAX_CONNECTIONS: int = 50        # Максимум соединений в пуле
+    REDIS_POOL_TIMEOUT: float = 5.0        # Сколько ждать свободное соединение, секунды
+    REDIS_SOCKET_TIMEOUT: float = 10.0     # Таймаут операции (больше таймаута BLMOVE очереди уведомлений - 5 с)
+    REDIS_CONNECT_TIMEOUT: float = 2.0     # Таймаут установки соединения
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # PING простаивающего соединения перед использованием, секунды
+    REDIS_RETRY_ATTEMPTS: int = 3          # Повторы при сетевых ошибках (экспоненциальная задержка)
+
+    # --- Хранилище FSM ---
+    FSM_STATE_TTL: int = 24 * 60 * 60  # Время жизни состояния без активности, секунды (0 - бессрочно)
+    FSM_DATA_TTL: int = 24 * 60 * 60   # Время жизни данных сценария (черновик проекта, результаты поиска)
+    FSM_STATS_INTERVAL: int = 300      # Как часто считать ключи/байты FSM для метрик (0 - не считать)
+    FSM_LOCK_TIMEOUT: int = 60         # Замок чата освобождается сам, если процесс упал посреди апдейта, секунды
 
     # --- PostgreSQL (Переменные, которые вы используете в Docker Compose и .env) ---
     POSTGRES_USER: str
@@ -37,11 +132,36 @@ class Settings(BaseSettings):
     # Переменная в коде - DB_URL. Загружаем ее из DATABASE_URL в .env
     DB_URL: str = Field(validation_alias="DATABASE_URL")
 
+    # --- Денормализованные счетчики ---
+    # Как часто (в секундах) сверять таблицу counters с реальными данными
+    COUNTERS_RECONCILE_INTERVAL: int = 600
+
+    # --- Буфер регистрации пользователей (/start) ---
+    USER_BUFFER_FLUSH_INTERVAL_MS: int = 500 # Сброс в БД не реже, чем раз в N мс
+    USER_BUFFER_MAX_BATCH: int = 500         # ...или при накоплении M записей
+    USER_BUFFER_MAX_RETRIES: int = 5         # Неудачных попыток записи, после которых пользователь отбрасывается
+
     # Метод, чтобы удобно получать токен в виде строки
     def get_bot_token(self) -> str:
         """Возвращает токен бота в виде строки."""
         return self.BOT_TOKEN.get_secret_value()
 
+    def get_webhook_url(self) -> str:
+        """Возвращает полный URL webhook."""
+        if not self.WEBHOOK_BASE_URL:
+            raise ValueError("WEBHOOK_BASE_URL is required when BOT_MODE=webhook")
+        return self.WEBHOOK_BASE_URL.rstrip("/") + self.WEBHOOK_PATH
+
+    def get_webhook_secret(self) -> str:
+        """
+        Возвращает секрет для заголовка X-Telegram-Bot-Api-Secret-Token.
+        Без явного WEBHOOK_SECRET он детерминированно выводится из токена,
+        чтобы все воркеры проверяли одно и то же значение.
+        """
+        if self.WEBHOOK_SECRET:
+            return self.WEBHOOK_SECRET.get_secret_value()
+        return hashlib.sha256(self.get_bot_token().encode()).hexdigest()
+
     # Метод для получения пароля PostgreSQL (если нужен в коде)
     def get_postgres_password(self) -> str:
         """Возвращает пароль PostgreSQL в виде строки."""
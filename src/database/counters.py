@@ -0,0 +1,119 @@
+# src/database/counters.py
+import asyncio
+import logging
+
+from sqlalchemy import select, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.database.models import Counter, PortfolioItem, User
+
+logger = logging.getLogger(__name__)
+
+# Имена счетчиков. category_id = 0 означает "все категории" (как в CategoryCallback)
+USERS = "users"
+
+
+def approved_key(category_id: int = 0) -> str:
+    return f"approved:{category_id}"
+
+
+def pending_key(category_id: int = 0) -> str:
+    return f"pending:{category_id}"
+
+
+def project_deltas(category_id: int, is_approved: bool, delta: int) -> dict[str, int]:
+    """Изменения счетчиков при добавлении (+1) или удалении (-1) проекта."""
+    key = approved_key if is_approved else pending_key
+    return {key(category_id): delta, key(0): delta}
+
+
+def approval_deltas(category_id: int) -> dict[str, int]:
+    """Изменения счетчиков при одобрении проекта: pending -> approved."""
+    return {
+        pending_key(category_id): -1, pending_key(0): -1,
+        approved_key(category_id): 1, approved_key(0): 1,
+    }
+
+
+async def bump_counters(session: AsyncSession, deltas: dict[str, int]):
+    """
+    Применяет изменения счетчиков в ТЕКУЩЕЙ транзакции сессии
+    (коммит делает вызывающий код вместе с основным изменением).
+    """
+    # Строки счетчиков блокируются в порядке VALUES: сортировка по имени дает всем
+    # транзакциям один порядок блокировок и исключает взаимные блокировки (deadlock)
+    values = [{"name": name, "value": delta} for name, delta in sorted(deltas.items()) if delta]
+    if not values:
+        return
+    stmt = pg_insert(Counter).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Counter.name],
+        set_={"value": Counter.value + stmt.excluded.value}
+    )
+    await session.execute(stmt)
+
+
+async def get_counters(session: AsyncSession, *names: str) -> dict[str, int]:
+    """Читает несколько счетчиков одним запросом по первичному ключу."""
+    result = await session.execute(select(Counter.name, Counter.value).where(Counter.name.in_(names)))
+    values = dict(result.all())
+    # Отрицательное значение возможно только при расхождении - до ближайшей сверки считаем его нулем
+    return {name: max(0, values.get(name, 0)) for name in names}
+
+
+async def get_counter(session: AsyncSession, name: str) -> int:
+    return (await get_counters(session, name))[name]
+
+
+async def _actual_counters(session: AsyncSession) -> dict[str, int]:
+    """Считает реальные значения счетчиков по таблицам (один GROUP BY + count пользователей)."""
+    actual = {USERS: await session.scalar(select(func.count(User.id)))}
+    rows = await session.execute(
+        select(PortfolioItem.category_id, PortfolioItem.is_approved, func.count(PortfolioItem.id))
+        .group_by(PortfolioItem.category_id, PortfolioItem.is_approved)
+    )
+    for category_id, is_approved, count in rows:
+        for name, delta in project_deltas(category_id, is_approved, count).items():
+            actual[name] = actual.get(name, 0) + delta
+    return actual
+
+
+async def reconcile_counters(session_maker: async_sessionmaker[AsyncSession]) -> dict[str, int]:
+    """
+    Сверяет счетчики с таблицами и исправляет расхождения.
+    Возвращает {имя: исправленное значение} для счетчиков, которые разошлись.
+    """
+    async with session_maker() as session:
+        async with session.begin():
+            # Блокируем запись в счетчики на время пересчета: транзакции, уже изменившие
+            # счетчики, успеют закоммититься, а новые применят свои изменения после нас
+            await session.execute(text("LOCK TABLE counters IN SHARE ROW EXCLUSIVE MODE"))
+            actual = await _actual_counters(session)
+            stored = dict((await session.execute(select(Counter.name, Counter.value))).all())
+
+            fixed = {
+                name: actual.get(name, 0)
+                for name in set(actual) | set(stored)
+                if actual.get(name, 0) != stored.get(name)
+            }
+            if fixed:
+                stmt = pg_insert(Counter).values([{"name": name, "value": value} for name, value in fixed.items()])
+                stmt = stmt.on_conflict_do_update(index_elements=[Counter.name], set_={"value": stmt.excluded.value})
+                await session.execute(stmt)
+
+    if fixed:
+        logger.warning(f"Счетчики расходились с таблицами и были исправлены: {fixed}")
+    return fixed
+
+
+async def run_counters_reconciler(session_maker: async_sessionmaker[AsyncSession], interval: float):
+    """Фоновая задача: периодическая сверка счетчиков."""
+    while True:
+        try:
+            await reconcile_counters(session_maker)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка сверки счетчиков: {e}", exc_info=True)
+        await asyncio.sleep(interval)
@@ -0,0 +1,127 @@
+# src/database/instrumentation.py
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.config import settings
+from src.services.metrics import (
+    DB_QUERY_LATENCY, DB_SLOW_QUERIES,
+    DB_POOL_CHECKOUT_WAIT, DB_POOL_CHECKED_OUT, DB_POOL_SATURATION, DB_POOL_CONNECTIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """Счетчики SQL-запросов в рамках одного апдейта."""
+    handler: str = "unknown"
+    queries: int = 0
+    db_time: float = 0.0
+
+
+# Статистика текущего апдейта (устанавливается QueryAccountingMiddleware)
+current_query_stats: ContextVar[QueryStats | None] = ContextVar("current_query_stats", default=None)
+
+
+def set_current_handler(name: str):
+    """Запоминает имя хэндлера для лога медленных запросов (вложенные вызовы не перезаписывают его)."""
+    stats = current_query_stats.get()
+    if stats is not None and stats.handler == "unknown":
+        stats.handler = name
+
+
+def _compact_sql(statement: str, limit: int = 1000) -> str:
+    # Параметры в лог не попадают: в statement только плейсхолдеры ($1, %(name)s)
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+def install_query_hooks(engine: AsyncEngine, slow_query_threshold: float):
+    """Подключает учет времени и количества запросов к движку."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(exception_context):
+        # after_cursor_execute не вызывается для упавшего запроса - иначе время начала осталось бы в стеке
+        conn = exception_context.connection
+        if conn is not None and exception_context.cursor is not None:
+            started = conn.info.get("query_started_at")
+            if started:
+                started.pop()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+        DB_QUERY_LATENCY.observe(elapsed)
+
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+
+        if elapsed >= slow_query_threshold:
+            handler = stats.handler if stats is not None else "background"
+            DB_SLOW_QUERIES.labels(handler).inc()
+            logger.warning(f"Slow query {elapsed * 1000:.1f} ms in {handler}: {_compact_sql(statement)}")
+
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, который измеряет время ожидания свободного соединения."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+
+def install_pool_metrics(engine: AsyncEngine):
+    """
+    Метрики загрузки пула: занятые и открытые соединения, доля занятых от максимума
+    (DB_POOL_SIZE + DB_MAX_OVERFLOW). Гауги обновляются явно в событиях пула, а не через
+    set_function: такие гауги не экспортируются в multiprocess-режиме prometheus_client.
+    """
+    if not isinstance(engine.sync_engine.pool, AsyncAdaptedQueuePool):
+        return
+    capacity = settings.DB_POOL_SIZE + max(settings.DB_MAX_OVERFLOW, 0)
+    checked_out = 0
+
+    def update_saturation():
+        DB_POOL_SATURATION.set(checked_out / capacity if capacity else 0.0)
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        nonlocal checked_out
+        checked_out += 1
+        DB_POOL_CHECKED_OUT.inc()
+        update_saturation()
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        nonlocal checked_out
+        checked_out -= 1
+        DB_POOL_CHECKED_OUT.dec()
+        update_saturation()
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        DB_POOL_CONNECTIONS.inc()
+
+    @event.listens_for(engine.sync_engine, "close")
+    def on_close(dbapi_connection, connection_record):
+        DB_POOL_CONNECTIONS.dec()
+
+    @event.listens_for(engine.sync_engine, "close_detached")
+    def on_close_detached(dbapi_connection):
+        DB_POOL_CONNECTIONS.dec()
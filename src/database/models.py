@@ -1,7 +1,18 @@
 # src/database/models.py
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime, ForeignKey, Index, Computed, text, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import DeclarativeBase, relationship, Mapped, mapped_column
 
+# Конфигурация полнотекстового поиска: 'simple' без стемминга, одинаково работает для русского и английского
+SEARCH_CONFIG = 'simple'
+# Название весит больше описания (веса A и B для ts_rank_cd)
+SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')"
+)
+
 # Базовый класс для моделей (должен быть определен здесь, а не импортирован)
 class Base(DeclarativeBase):
     pass
@@ -10,7 +21,7 @@ class User(Base):
     __tablename__ = 'users'
     
     id: Mapped[int] = mapped_column(primary_key=True)
-    user_id: Mapped[int] = mapped_column(Integer, unique=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False) # Telegram ID не влезает в 32 бита
     username: Mapped[str | None] = mapped_column(String)
     is_admin: Mapped[bool] = mapped_column(Boolean, default=False)
     
@@ -34,6 +45,19 @@ class Category(Base):
 
 class PortfolioItem(Base):
     __tablename__ = 'portfolio_items'
+    # Частичные индексы под реальные запросы хэндлеров (см. миграцию 5c1d9f3b7a21)
+    __table_args__ = (
+        Index('ix_portfolio_items_approved_category_id', 'category_id', 'id', postgresql_where=text('is_approved')),
+        Index('ix_portfolio_items_approved_id', 'id', postgresql_where=text('is_approved')),
+        Index('ix_portfolio_items_pending_id', 'id', postgresql_where=text('NOT is_approved')),
+        Index('ix_portfolio_items_user_id', 'user_id'),
+        # Поиск /search: полнотекстовый (GIN по tsvector) и нечеткий по названию (pg_trgm), см. миграцию c3f7a9e1b254
+        Index('ix_portfolio_items_search_vector', 'search_vector', postgresql_using='gin', postgresql_where=text('is_approved')),
+        Index(
+            'ix_portfolio_items_title_trgm', 'title', postgresql_using='gin',
+            postgresql_ops={'title': 'gin_trgm_ops'}, postgresql_where=text('is_approved')
+        ),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(String, nullable=False)
@@ -49,13 +73,39 @@ class PortfolioItem(Base):
     # СИСТЕМА МОДЕРАЦИИ: Проект одобрен?
     is_approved: Mapped[bool] = mapped_column(Boolean, default=False)
     
+    # ВЕРСИЯ: увеличивается при каждом изменении проекта (ключ кэша отрисованных карточек)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default='1')
+    
+    # ОЧЕРЕДЬ МОДЕРАЦИИ: кто из модераторов держит проект и до какого момента (см. src/database/moderation.py)
+    lease_owner: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    lease_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    
     # КЛЮЧЕВОЕ ПОЛЕ: ID пользователя, который добавил проект
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.user_id'), nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey('users.user_id'), nullable=False)
     creator: Mapped["User"] = relationship(back_populates="projects")
     
     # КАТЕГОРИЗАЦИЯ
     category_id: Mapped[int] = mapped_column(ForeignKey('categories.id'), nullable=False)
     category: Mapped["Category"] = relationship(back_populates="items")
     
+    # ПОИСК: вычисляемая колонка, Postgres сам пересчитывает ее при изменении title/description
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True), deferred=True
+    )
+    
+    def __repr__(self):
+        return f"<Portfolio(id={self.id}, title='{self.title}', approved={self.is_approved})>"
+
+class Counter(Base):
+    """
+    Денормализованные счетчики: обновляются в той же транзакции, что и изменения
+    проектов/пользователей, и сверяются периодической задачей (src/database/counters.py).
+    """
+    __tablename__ = 'counters'
+    
+    name: Mapped[str] = mapped_column(String, primary_key=True) # 'users', 'approved:<category_id>', 'pending:<category_id>'
+    value: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    
     def __repr__(self):
-        return f"<Portfolio(id={self.id}, title='{self.title}', approved={self.is_approved})>"
\ No newline at end of file
+        return f"<Counter(name='{self.name}', value={self.value})>"
\ No newline at end of file
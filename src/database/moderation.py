@@ -0,0 +1,215 @@
+# src/database/moderation.py
+import asyncio
+import logging
+from collections import Counter as Tally
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update, delete, func, or_, any_, bindparam, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.database.models import PortfolioItem
+from src.database.counters import bump_counters, approval_deltas, project_deltas, get_counter, pending_key
+from src.services.metrics import MODERATION_QUEUE_DEPTH, MODERATION_QUEUE_AGE, MODERATION_QUEUE_LEASED
+
+logger = logging.getLogger(__name__)
+
+
+def _ids_param(ids: list[int]):
+    # Один параметр-массив: WHERE id = ANY(:ids) - текст запроса не зависит от размера пачки
+    return any_(bindparam("ids", value=list(ids), type_=ARRAY(Integer)))
+
+
+def _not_leased_by_others(moderator_id: int):
+    # Проект свободен: аренды нет, она истекла или принадлежит этому модератору
+    return or_(
+        PortfolioItem.lease_until.is_(None),
+        PortfolioItem.lease_until < func.now(),
+        PortfolioItem.lease_owner == moderator_id,
+    )
+
+
+async def select_pending_ids(
+    session: AsyncSession,
+    *,
+    category_id: int | None = None,
+    user_id: int | None = None,
+    limit: int = 500,
+) -> list[int]:
+    """ID проектов на модерации по фильтру (категория и/или автор), старые первыми."""
+    stmt = select(PortfolioItem.id).where(PortfolioItem.is_approved == False)
+    if category_id:
+        stmt = stmt.where(PortfolioItem.category_id == category_id)
+    if user_id:
+        stmt = stmt.where(PortfolioItem.user_id == user_id)
+    return list(await session.scalars(stmt.order_by(PortfolioItem.id).limit(limit)))
+
+
+async def bulk_approve(session: AsyncSession, ids: list[int], moderator_id: int | None = None) -> list:
+    """
+    Одобряет пачку проектов одним UPDATE в текущей транзакции.
+    Возвращает строки (id, user_id, title, category_id) реально одобренных проектов -
+    уже одобренные или удаленные другим модератором пропускаются.
+    С moderator_id пропускаются и проекты, арендованные в очереди другим модератором.
+    """
+    stmt = (
+        update(PortfolioItem)
+        .where(PortfolioItem.id == _ids_param(ids), PortfolioItem.is_approved == False)
+        .values(is_approved=True, version=PortfolioItem.version + 1, lease_owner=None, lease_until=None)
+        .returning(PortfolioItem.id, PortfolioItem.user_id, PortfolioItem.title, PortfolioItem.category_id)
+        .execution_options(synchronize_session=False)
+    )
+    if moderator_id is not None:
+        stmt = stmt.where(_not_leased_by_others(moderator_id))
+    rows = (await session.execute(stmt)).all()
+    await bump_counters(session, _sum_deltas(
+        {name: delta * count for name, delta in approval_deltas(category_id).items()}
+        for category_id, count in _by_category(rows).items()
+    ))
+    return rows
+
+
+async def bulk_reject(session: AsyncSession, ids: list[int], moderator_id: int | None = None) -> list:
+    """Отклоняет (удаляет) пачку проектов одним DELETE в текущей транзакции (moderator_id - как в bulk_approve)."""
+    stmt = (
+        delete(PortfolioItem)
+        .where(PortfolioItem.id == _ids_param(ids), PortfolioItem.is_approved == False)
+        .returning(PortfolioItem.id, PortfolioItem.user_id, PortfolioItem.title, PortfolioItem.category_id)
+        .execution_options(synchronize_session=False)
+    )
+    if moderator_id is not None:
+        stmt = stmt.where(_not_leased_by_others(moderator_id))
+    rows = (await session.execute(stmt)).all()
+    await bump_counters(session, _sum_deltas(
+        project_deltas(category_id, is_approved=False, delta=-count)
+        for category_id, count in _by_category(rows).items()
+    ))
+    return rows
+
+
+async def claim_approve(session: AsyncSession, item_id: int, moderator_id: int | None = None):
+    """
+    Одобряет один проект, только если он все еще на модерации (UPDATE ... WHERE is_approved = false RETURNING)
+    и не арендован в очереди другим модератором.
+    Из одновременных действий разных модераторов над одним проектом выигрывает ровно одно:
+    остальные ждут блокировку строки и после ее снятия не находят подходящую строку.
+    Возвращает (id, user_id, title, category_id) или None, если проект уже обработан.
+    """
+    rows = await bulk_approve(session, [item_id], moderator_id)
+    return rows[0] if rows else None
+
+
+async def claim_reject(session: AsyncSession, item_id: int, moderator_id: int | None = None):
+    """Отклоняет (удаляет) один проект на модерации по тому же принципу, что и claim_approve."""
+    rows = await bulk_reject(session, [item_id], moderator_id)
+    return rows[0] if rows else None
+
+
+async def claim_delete(session: AsyncSession, item_id: int):
+    """Удаляет проект в любом статусе; при одновременных удалениях счетчики уменьшает только выигравшее."""
+    stmt = (
+        delete(PortfolioItem)
+        .where(PortfolioItem.id == item_id)
+        .returning(PortfolioItem.id, PortfolioItem.title, PortfolioItem.category_id, PortfolioItem.is_approved)
+        .execution_options(synchronize_session=False)
+    )
+    row = (await session.execute(stmt)).first()
+    if row is not None:
+        await bump_counters(session, project_deltas(row.category_id, row.is_approved, delta=-1))
+    return row
+
+
+async def lease_next_pending(
+    session: AsyncSession,
+    moderator_id: int,
+    *,
+    after_id: int | None = None,
+    lease_seconds: int = 300,
+) -> PortfolioItem | None:
+    """
+    Выдает модератору следующий свободный проект из очереди модерации (старые первыми)
+    и арендует его на lease_seconds. Прежняя аренда модератора снимается - в каждый момент
+    он держит не больше одного проекта.
+
+    Кандидат выбирается с FOR UPDATE SKIP LOCKED, поэтому одновременные запросы разных
+    модераторов не ждут друг друга и получают разные проекты; брошенная аренда
+    (модератор ушел) истекает, и проект снова попадает в очередь.
+    after_id - продолжить после этого проекта ("Пропустить"); в конце очереди - по кругу с начала.
+    """
+    await session.execute(
+        update(PortfolioItem)
+        .where(PortfolioItem.lease_owner == moderator_id, PortfolioItem.is_approved == False)
+        .values(lease_owner=None, lease_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    item = await _lease_after(session, moderator_id, after_id, lease_seconds)
+    if item is None and after_id is not None:
+        item = await _lease_after(session, moderator_id, None, lease_seconds)
+    return item
+
+
+async def _lease_after(session: AsyncSession, moderator_id: int, after_id: int | None, lease_seconds: int) -> PortfolioItem | None:
+    candidate = select(PortfolioItem.id).where(
+        PortfolioItem.is_approved == False,
+        _not_leased_by_others(moderator_id),
+    )
+    if after_id is not None:
+        candidate = candidate.where(PortfolioItem.id > after_id)
+    candidate = candidate.order_by(PortfolioItem.id).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+
+    stmt = (
+        update(PortfolioItem)
+        .where(PortfolioItem.id == candidate)
+        .values(lease_owner=moderator_id, lease_until=func.now() + timedelta(seconds=lease_seconds))
+        .returning(PortfolioItem)
+        .execution_options(synchronize_session=False)
+    )
+    return (await session.scalars(stmt)).first()
+
+
+async def moderation_queue_stats(session: AsyncSession) -> tuple[int, float, int]:
+    """
+    Состояние очереди модерации: (глубина, возраст старейшего проекта в секундах, арендовано сейчас).
+    Глубина берется из счетчика, старейший проект - по частичному индексу ожидающих проектов.
+    """
+    depth = await get_counter(session, pending_key(0))
+    oldest = await session.scalar(
+        select(PortfolioItem.created_at)
+        .where(PortfolioItem.is_approved == False)
+        .order_by(PortfolioItem.id)
+        .limit(1)
+    )
+    leased = await session.scalar(
+        select(func.count(PortfolioItem.id))
+        .where(PortfolioItem.is_approved == False, PortfolioItem.lease_until > func.now())
+    )
+    age = (datetime.now(timezone.utc) - oldest).total_seconds() if oldest is not None else 0.0
+    return depth, max(age, 0.0), leased or 0
+
+
+async def run_moderation_queue_stats(session_maker: async_sessionmaker[AsyncSession], interval: float):
+    """Фоновая задача: периодически обновляет метрики очереди модерации."""
+    while True:
+        try:
+            async with session_maker() as session:
+                depth, age, leased = await moderation_queue_stats(session)
+            MODERATION_QUEUE_DEPTH.set(depth)
+            MODERATION_QUEUE_AGE.set(age)
+            MODERATION_QUEUE_LEASED.set(leased)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка подсчета очереди модерации: {e}", exc_info=True)
+        await asyncio.sleep(interval)
+
+
+def _by_category(rows) -> Tally:
+    return Tally(row.category_id for row in rows)
+
+
+def _sum_deltas(deltas_list) -> dict[str, int]:
+    total: dict[str, int] = {}
+    for deltas in deltas_list:
+        for name, delta in deltas.items():
+            total[name] = total.get(name, 0) + delta
+    return total
@@ -0,0 +1,140 @@
+# src/database/queries.py
+from dataclasses import dataclass
+
+from sqlalchemy import select, func, cast
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import PortfolioItem, Category, Counter, SEARCH_CONFIG
+from src.database.counters import approved_key, pending_key
+
+
+@dataclass(slots=True)
+class ProjectCard:
+    """Все, что нужно для отрисовки одной карточки проекта."""
+    item: PortfolioItem
+    category_name: str
+    prev_id: int | None
+    next_id: int | None
+    total_count: int
+    wrapped: bool  # курсор ушел за край списка, и показан первый проект
+
+    def position(self, requested_index: int) -> int:
+        """Индекс для счетчика N/M, согласованный с наличием соседей."""
+        if self.wrapped or self.prev_id is None:
+            return 0
+        if self.next_id is None:
+            return self.total_count - 1
+        return max(1, min(requested_index, self.total_count - 2))
+
+
+def _list_filters(model, approved: bool, category_id: int) -> list:
+    filters = [model.is_approved == approved]
+    if category_id != 0:
+        filters.append(model.category_id == category_id)
+    return filters
+
+
+async def fetch_project_card(
+    session: AsyncSession,
+    *,
+    approved: bool,
+    category_id: int,
+    cursor_id: int | None,
+    direction: str = "next",
+) -> ProjectCard | None:
+    """
+    Одним запросом возвращает карточку: проект (seek по id от cursor_id в направлении direction),
+    название его категории, id соседей и общее количество из счетчиков.
+    Если в нужном направлении проектов нет, возвращается первый проект списка (wrapped=True).
+    None - список пуст.
+    """
+    seek = aliased(PortfolioItem)
+    first = aliased(PortfolioItem)
+    neighbour = aliased(PortfolioItem)
+
+    # Текущий проект: seek по id; если за курсором пусто - первый в списке
+    if direction == "prev":
+        seek_id = select(func.max(seek.id)).where(*_list_filters(seek, approved, category_id), seek.id < cursor_id)
+    else:
+        seek_id = select(func.min(seek.id)).where(*_list_filters(seek, approved, category_id))
+        if cursor_id is not None:
+            seek_id = seek_id.where(seek.id > cursor_id)
+    first_id = select(func.min(first.id)).where(*_list_filters(first, approved, category_id))
+    current_id = func.coalesce(seek_id.scalar_subquery(), first_id.scalar_subquery())
+
+    # Соседи (коррелированные подзапросы, каждый - один шаг по индексу)
+    prev_id = (
+        select(func.max(neighbour.id))
+        .where(*_list_filters(neighbour, approved, category_id), neighbour.id < PortfolioItem.id)
+        .scalar_subquery()
+    )
+    next_id = (
+        select(func.min(neighbour.id))
+        .where(*_list_filters(neighbour, approved, category_id), neighbour.id > PortfolioItem.id)
+        .scalar_subquery()
+    )
+    counter_name = approved_key(category_id) if approved else pending_key(category_id)
+    total_count = select(Counter.value).where(Counter.name == counter_name).scalar_subquery()
+
+    stmt = (
+        select(PortfolioItem, Category.name, prev_id, next_id, total_count)
+        .join(Category, Category.id == PortfolioItem.category_id)
+        .where(PortfolioItem.id == current_id)
+    )
+    row = (await session.execute(stmt)).first()
+    if row is None:
+        return None
+
+    item, category_name, prev_id, next_id, total_count = row
+    wrapped = cursor_id is not None and (
+        item.id <= cursor_id if direction != "prev" else item.id >= cursor_id
+    )
+    return ProjectCard(
+        item=item,
+        category_name=category_name,
+        prev_id=prev_id,
+        next_id=next_id,
+        # Счетчик может временно отставать до сверки - не показываем меньше, чем видим
+        total_count=max(total_count or 0, 1 + (prev_id is not None) + (next_id is not None)),
+        wrapped=wrapped,
+    )
+
+
+async def search_project_ids(session: AsyncSession, query: str, *, limit: int) -> list[int]:
+    """
+    Id одобренных проектов по запросу, от самых релевантных.
+    Сначала полнотекстовый поиск по search_vector (GIN), если он ничего не нашел -
+    нечеткое совпадение по названию (pg_trgm), чтобы опечатки тоже находились.
+    """
+    ts_query = func.websearch_to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), query)
+    stmt = (
+        select(PortfolioItem.id)
+        .where(PortfolioItem.is_approved, PortfolioItem.search_vector.op('@@')(ts_query))
+        .order_by(func.ts_rank_cd(PortfolioItem.search_vector, ts_query).desc(), PortfolioItem.id.desc())
+        .limit(limit)
+    )
+    ids = list((await session.scalars(stmt)).all())
+    if ids:
+        return ids
+
+    # title % :query использует триграммный индекс (порог pg_trgm.similarity_threshold)
+    stmt = (
+        select(PortfolioItem.id)
+        .where(PortfolioItem.is_approved, PortfolioItem.title.op('%')(query))
+        .order_by(func.similarity(PortfolioItem.title, query).desc(), PortfolioItem.id.desc())
+        .limit(limit)
+    )
+    return list((await session.scalars(stmt)).all())
+
+
+async def fetch_approved_item(session: AsyncSession, item_id: int) -> tuple[PortfolioItem, str] | None:
+    """Одобренный проект и название его категории; None - проект удален или снят с публикации."""
+    stmt = (
+        select(PortfolioItem, Category.name)
+        .join(Category, Category.id == PortfolioItem.category_id)
+        .where(PortfolioItem.id == item_id, PortfolioItem.is_approved)
+    )
+    row = (await session.execute(stmt)).first()
+    return tuple(row) if row is not None else None
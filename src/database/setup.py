@@ -1,19 +1,64 @@
 # src/database/setup.py
 import logging
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy import select
+from uuid import uuid4
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
+from sqlalchemy import select, make_url, text
 from typing import AsyncGenerator
 
 # (ИСПРАВЛЕНО) Импортируем 'settings' из нашего нового config.py
 from src.config import settings 
 from src.database.models import Base, User, Category 
+from src.database.counters import bump_counters, USERS
+from src.database.instrumentation import install_query_hooks, install_pool_metrics, InstrumentedAsyncQueuePool
 
 # Настройка логгера
 logger = logging.getLogger(__name__)
 
+def create_db_engine(url: str | None = None) -> AsyncEngine:
+    """
+    Единственная фабрика движка: пул соединений, кэш prepared statements asyncpg
+    и statement_timeout на стороне сервера задаются через Settings.
+    """
+    url = make_url(url or settings.DB_URL)
+    connect_args = {}
+    if url.get_driver_name() == "asyncpg":
+        connect_args = {
+            # Кэш prepared statements адаптера SQLAlchemy
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)},
+        }
+        if not settings.DB_STATEMENT_CACHE_SIZE:
+            # Режим pgbouncer (pool_mode=transaction): выключаем и собственный кэш asyncpg,
+            # а имена prepared statements делаем уникальными - иначе они сталкиваются
+            # на серверных соединениях, которые pgbouncer раздает разным клиентам
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+            # pgbouncer отклоняет неизвестные параметры запуска ("unsupported startup parameter"),
+            # а SET на соединении не переживет смену серверного соединения - timeout задается
+            # на роли: ALTER ROLE <user> SET statement_timeout = '5s'
+            del connect_args["server_settings"]
+            logger.info("DB_STATEMENT_CACHE_SIZE=0 (pgbouncer): statement_timeout is not sent, set it on the DB role.")
+
+    db_engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    # Учет количества/времени запросов на апдейт и лог медленных запросов
+    install_query_hooks(db_engine, slow_query_threshold=settings.SLOW_QUERY_THRESHOLD_MS / 1000)
+    # Загрузка пула: занятые соединения и насыщение
+    install_pool_metrics(db_engine)
+    return db_engine
+
 # Асинхронный движок
 # (ИСПРАВЛЕНО) Используем 'settings.DB_URL'
-engine = create_async_engine(settings.DB_URL, echo=False)
+engine = create_db_engine()
 
 # Фабрика асинхронных сессий
 AsyncSessionLocal = async_sessionmaker(
@@ -23,6 +68,8 @@ AsyncSessionLocal = async_sessionmaker(
 async def init_db():
     """Создает все таблицы в базе данных."""
     async with engine.begin() as conn:
+        # Триграммный индекс по названию проекта требует расширения pg_trgm
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
     logger.info("База данных инициализирована и таблицы созданы.")
 
@@ -41,6 +88,7 @@ async def ensure_admin_exists(admin_id: int):
         if not admin:
             new_admin = User(user_id=admin_id, username="admin_user", is_admin=True)
             session.add(new_admin)
+            await bump_counters(session, {USERS: 1})
             await session.commit()
             logger.info(f"Администратор с ID {admin_id} добавлен.")
         else:
@@ -51,7 +99,7 @@ async def ensure_admin_exists(admin_id: int):
                 logger.info(f"Пользователю {admin_id} выданы права администратора.")
 
 
-async def ensure_default_categories(session_maker: async_sessionmaker[AsyncSession]):
+async def ensure_default_categories(session_maker: async_sessionmaker[AsyncSession]) -> int:
     """Создает стандартные IT-категории, если их нет."""
     default_categories = [
         "Backend (Python)", 
@@ -80,4 +128,7 @@ async def ensure_default_categories(session_maker: async_sessionmaker[AsyncSessi
             if categories_added > 0:
                 logger.info(f"Добавлено {categories_added} стандартных категорий.")
             else:
-                logger.info("Стандартные категории уже существуют.")
\ No newline at end of file
+                logger.info("Стандартные категории уже существуют.")
+    
+    # Количество добавленных категорий нужно, чтобы сбросить кэш категорий
+    return categories_added
\ No newline at end of file
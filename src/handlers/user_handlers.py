@@ -1,18 +1,50 @@
+import html
+
 from aiogram import Router, F
-from aiogram.filters import CommandStart, Command, StateFilter 
-from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
+from aiogram.filters import CommandStart, Command, CommandObject, StateFilter 
+from aiogram.types import (
+    Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery,
+    InlineQuery, InlineQueryResultArticle, InlineQueryResultCachedPhoto, InputTextMessageContent
+)
 from aiogram.fsm.context import FSMContext
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker 
-from sqlalchemy import select, func
+from aiogram.exceptions import TelegramBadRequest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from src.middlewares.admin_check import AdminMiddleware
-from src.database.models import User, PortfolioItem, Category 
+from src.middlewares.metrics import HandlerMetricsMiddleware
+from src.database.models import User, PortfolioItem 
 from src.fsm.project_fsm import AddProjectStates, UserAddProjectStates 
-from src.callbacks.project_cb import ProjectCallback, CategoryCallback
+from src.callbacks.project_cb import ProjectCallback, CategoryCallback, BulkModerationCallback
 from src.config import settings
+from src.services.category_cache import CategoryCache
+from src.services.user_buffer import UserRegistrationBuffer
+from src.services.notifier import NotificationQueue
+from src.services.inline_results import InlineResultsCache
+from src.services.card_cache import CardRenderCache, RenderedCard
+from src.services.card_presenter import present_card
+from src.services.browse_snapshot import BrowseSnapshots
+from src.services.role_cache import RoleCache
+from src.services.metrics import BROWSE_CARDS
+from src.database.counters import (
+    bump_counters, get_counter, get_counters, approved_key, pending_key,
+    project_deltas, USERS
+)
+from src.database.queries import fetch_project_card, search_project_ids, fetch_approved_item
+from src.database.moderation import (
+    select_pending_ids, bulk_approve, bulk_reject, claim_approve, claim_reject, claim_delete,
+    lease_next_pending
+)
 
 router = Router()
 admin_router = Router()
-admin_router.message.middleware(AdminMiddleware()) 
+
+# Metrics first, so that they also cover updates rejected by the admin check
+for observer in (router.message, router.callback_query, router.inline_query, admin_router.message, admin_router.callback_query):
+    observer.middleware(HandlerMetricsMiddleware())
+
+# Both admin commands and admin buttons are restricted (the role comes from RoleMiddleware, no DB lookup)
+admin_router.message.middleware(AdminMiddleware())
+admin_router.callback_query.middleware(AdminMiddleware())
 
 # --- PRIVATE KEYBOARD FUNCTIONS AND UTILITIES ---
 
@@ -27,59 +59,41 @@ def get_admin_main_keyboard() -> InlineKeyboardMarkup:
     """Returns the main admin panel keyboard, including public buttons."""
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="🚨 Project Moderation", callback_data="admin_moderate_list")],
+        [InlineKeyboardButton(text="📦 Bulk Moderation", callback_data="admin_bulk_menu")],
         [InlineKeyboardButton(text="➕ Add Project (as Admin)", callback_data="admin_add_project")],
         [InlineKeyboardButton(text="📊 User Statistics", callback_data="admin_stats")],
         [InlineKeyboardButton(text="👤 User List", callback_data="admin_list_users")],
         [InlineKeyboardButton(text="💼 View Portfolio", callback_data="show_portfolio")]
     ])
 
-async def get_categories_keyboard(session: AsyncSession) -> InlineKeyboardMarkup:
-    """Returns the keyboard for category selection."""
-    categories_stmt = select(Category).order_by(Category.name)
-    categories = await session.scalars(categories_stmt)
-    
+def get_project_navigation_keyboard(item: PortfolioItem, total_count: int, current_index: int, category_id: int, is_admin: bool = False, is_moderator_view: bool = False, has_prev: bool | None = None, has_next: bool | None = None, is_search_view: bool = False) -> InlineKeyboardMarkup:
+    """Returns the keyboard for project navigation. has_prev/has_next override the index-based check."""
     buttons = []
     
-    # "All Categories" button
-    buttons.append([InlineKeyboardButton(
-        text="⭐️ ALL PROJECTS", 
-        callback_data=CategoryCallback(category_id=0).pack()
-    )])
-    
-    # Category buttons
-    row = []
-    for cat in categories:
-        row.append(InlineKeyboardButton(
-            text=cat.name, 
-            callback_data=CategoryCallback(category_id=cat.id).pack()
-        ))
-        if len(row) == 2:
-            buttons.append(row)
-            row = []
-    if row:
-        buttons.append(row)
-
-    buttons.append([InlineKeyboardButton(text="🔙 Back to Main Menu", callback_data="show_start")])
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
-
-def get_project_navigation_keyboard(item: PortfolioItem, total_count: int, current_index: int, category_id: int, is_admin: bool = False, is_moderator_view: bool = False) -> InlineKeyboardMarkup:
-    """Returns the keyboard for project navigation."""
-    buttons = []
+    # Moderation and search views use their own actions so that the different kinds of paging never collide
+    # (the moderation queue has no "back": 'mod_next' skips to the next free project)
+    if is_moderator_view:
+        prev_action, next_action = None, "mod_next"
+    elif is_search_view:
+        prev_action, next_action = "search_prev", "search_next"
+    else:
+        prev_action, next_action = "prev", "next"
     
     # Navigation buttons (Back/Next)
     nav_row = []
-    if current_index > 0:
+    if prev_action and (has_prev if has_prev is not None else current_index > 0):
         nav_row.append(InlineKeyboardButton(
             text="⬅️ Back", 
-            callback_data=ProjectCallback(action="prev", item_id=item.id, current_index=current_index, category_id=category_id).pack()
+            callback_data=ProjectCallback(action=prev_action, item_id=item.id, current_index=current_index, category_id=category_id).pack()
         ))
     
-    nav_row.append(InlineKeyboardButton(text=f"{current_index + 1}/{total_count}", callback_data="ignore"))
+    position = f"⏳ {total_count} pending" if is_moderator_view else f"{current_index + 1}/{total_count}"
+    nav_row.append(InlineKeyboardButton(text=position, callback_data="ignore"))
     
-    if current_index < total_count - 1:
+    if has_next if has_next is not None else current_index < total_count - 1:
         nav_row.append(InlineKeyboardButton(
-            text="Next ➡️", 
-            callback_data=ProjectCallback(action="next", item_id=item.id, current_index=current_index, category_id=category_id).pack()
+            text="Skip ⏭" if is_moderator_view else "Next ➡️", 
+            callback_data=ProjectCallback(action=next_action, item_id=item.id, current_index=current_index, category_id=category_id).pack()
         ))
     buttons.append(nav_row)
 
@@ -121,30 +135,129 @@ def get_project_navigation_keyboard(item: PortfolioItem, total_count: int, curre
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
+def render_project_card(card_cache: CardRenderCache, item: PortfolioItem, view: str, is_admin: bool, category_name: str, category_id: int, current_index: int, total_count: int, has_prev: bool | None = None, has_next: bool | None = None) -> RenderedCard:
+    """
+    Returns the caption and keyboard of a project card ('portfolio', 'moderation' or 'search' view).
+    Renders are cached by (item id, item version, view/role, category, position, total, neighbours).
+    """
+    key = (item.id, item.version, view, is_admin, category_id, category_name, current_index, total_count, has_prev, has_next)
+    rendered = card_cache.get(key)
+    if rendered is not None:
+        return rendered
+
+    if view == "moderation":
+        caption = (
+            f"🚨 MODERATION (in queue: {total_count}):\n"
+            f"🔒 Reserved for you for {settings.MODERATION_LEASE_SECONDS // 60} min\n"
+            f"🗂️ Category: {category_name}\n"
+            f"📝 Title: {item.title}\n"
+            f"👤 Added by: <code>{item.user_id}</code>\n"
+            f"➖➖➖➖➖➖➖➖➖➖\n"
+            f"*{item.description}*"
+        )
+    elif view == "search":
+        caption = (
+            f"🔍 SEARCH RESULTS\n"
+            f"🗂️ Category: {category_name}\n"
+            f"💼 RESULT ({current_index + 1}/{total_count}): {item.title}\n"
+            f"➖➖➖➖➖➖➖➖➖➖\n"
+            f"*{item.description}*"
+        )
+    else:
+        caption = (
+            f"🗂️ Category: {category_name}\n"
+            f"💼 PROJECT ({current_index + 1}/{total_count}): {item.title}\n"
+            f"➖➖➖➖➖➖➖➖➖➖\n"
+            f"*{item.description}*"
+        )
+
+    keyboard = get_project_navigation_keyboard(
+        item, total_count, current_index, category_id, is_admin,
+        is_moderator_view=view == "moderation", has_prev=has_prev, has_next=has_next,
+        is_search_view=view == "search"
+    )
+    if view == "moderation":
+        # Insert moderation buttons BEFORE the back button
+        keyboard.inline_keyboard.insert(-1, [
+            InlineKeyboardButton(
+                text="✅ APPROVE", 
+                callback_data=ProjectCallback(action="approve", item_id=item.id, current_index=current_index, category_id=0).pack()
+            ),
+            InlineKeyboardButton(
+                text="❌ REJECT", 
+                callback_data=ProjectCallback(action="reject", item_id=item.id, current_index=current_index, category_id=0).pack()
+            )
+        ])
+    return card_cache.put(key, RenderedCard(caption=caption, reply_markup=keyboard, photo_file_id=item.photo_file_id))
+
+def get_bulk_filter_keyboard(categories: list[tuple[int, str]], pending: dict[int, int]) -> InlineKeyboardMarkup:
+    """Returns the keyboard for choosing which pending projects to moderate in bulk."""
+    buttons = [[InlineKeyboardButton(
+        text=f"⭐️ ALL PENDING ({pending.get(0, 0)})",
+        callback_data=BulkModerationCallback(action="select", category_id=0).pack()
+    )]]
+    for category_id, name in categories:
+        if pending.get(category_id):
+            buttons.append([InlineKeyboardButton(
+                text=f"{name} ({pending[category_id]})",
+                callback_data=BulkModerationCallback(action="select", category_id=category_id).pack()
+            )])
+    buttons.append([InlineKeyboardButton(text="🔙 Back to Moderation Menu", callback_data="back_to_admin_main_menu")])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+def get_bulk_confirm_keyboard() -> InlineKeyboardMarkup:
+    """Returns the keyboard for confirming a bulk moderation action."""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="✅ APPROVE ALL", callback_data=BulkModerationCallback(action="approve").pack()),
+            InlineKeyboardButton(text="❌ REJECT ALL", callback_data=BulkModerationCallback(action="reject").pack())
+        ],
+        [InlineKeyboardButton(text="🔙 Cancel", callback_data=BulkModerationCallback(action="cancel").pack())]
+    ])
+
+def get_inline_result(project: dict) -> InlineQueryResultCachedPhoto | InlineQueryResultArticle:
+    """Builds an inline query result from a cached project entry (see InlineResultsCache)."""
+    # The message is sent with the bot-wide parse_mode=HTML: user-submitted fields must be escaped
+    text = (
+        f"💼 {html.escape(project['title'])}\n🗂️ {html.escape(project['category'])}\n\n"
+        f"{html.escape(project['body'])}"
+    )
+    link = project["link"]
+    keyboard = None
+    if link and (link.startswith("http://") or link.startswith("https://")):
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="🔗 Go to Project", url=link)]])
+    
+    if project["photo_file_id"]:
+        return InlineQueryResultCachedPhoto(
+            id=str(project["id"]),
+            photo_file_id=project["photo_file_id"],
+            title=project["title"],
+            description=project["description"],
+            caption=text,
+            reply_markup=keyboard
+        )
+    return InlineQueryResultArticle(
+        id=str(project["id"]),
+        title=project["title"],
+        description=project["description"],
+        input_message_content=InputTextMessageContent(message_text=text),
+        reply_markup=keyboard
+    )
+
+def get_approved_notification_text(title: str) -> str:
+    return f"🎉 Congratulations! Your project '{title}' has passed moderation and been added to the portfolio!"
+
+def get_rejected_notification_text(title: str) -> str:
+    return f"❌ Unfortunately, your project '{title}' was rejected by the moderator."
+
 # --- Public Handlers (router) ---
 
 @router.message(CommandStart())
-async def command_start_handler(message: Message, session_maker: async_sessionmaker[AsyncSession]):
+async def command_start_handler(message: Message, user_buffer: UserRegistrationBuffer):
     
     # --- ENSURE USER CREATION ---
-    user_id = message.from_user.id
-    username = message.from_user.username
-    
-    async with session_maker() as session:
-        user_stmt = select(User).where(User.user_id == user_id)
-        user = await session.scalar(user_stmt)
-        
-        if not user:
-            new_user = User(
-                user_id=user_id,
-                username=username,
-                is_admin=(user_id == settings.ADMIN_ID)
-            )
-            session.add(new_user)
-            await session.commit()
-        elif user.username != username:
-            user.username = username
-            await session.commit()
+    # Write-behind: the user is upserted by the buffer in a batch, the reply does not wait for the DB
+    user_buffer.add(message.from_user.id, message.from_user.username)
     # -----------------------------------------------------------------
 
     await message.answer(
@@ -162,6 +275,7 @@ async def command_help_handler(message: Message):
         "• /start — Start communication\n"
         "• /help — Show this menu\n"
         "• /add_project — Suggest your project\n"
+        "• /search &lt;query&gt; — Find projects by title and description\n"
         "\nUse the buttons for quick access:",
         reply_markup=get_help_keyboard(),
         parse_mode='HTML'
@@ -197,12 +311,11 @@ async def callback_show_start(callback: CallbackQuery, state: FSMContext): # <--
 # --- Handler: Category Selection ---
 @router.callback_query(F.data == "show_portfolio", StateFilter(None))
 @router.callback_query(F.data == "show_categories", StateFilter(None))
-async def show_categories_handler(callback: CallbackQuery, session_maker: async_sessionmaker[AsyncSession]):
+async def show_categories_handler(callback: CallbackQuery, category_cache: CategoryCache):
     """Shows the category selection menu."""
     await callback.answer()
     
-    async with session_maker() as session:
-        keyboard = await get_categories_keyboard(session)
+    keyboard = await category_cache.get_keyboard()
     
     # Check to avoid editing a photo as text
     if callback.message.photo:
@@ -223,11 +336,12 @@ async def show_categories_handler(callback: CallbackQuery, session_maker: async_
 # --- Handler: Display projects by category and navigation ---
 @router.callback_query(CategoryCallback.filter(), StateFilter(None))
 @router.callback_query(ProjectCallback.filter(F.action.in_({"next", "prev"})), StateFilter(None))
-async def show_portfolio_by_category_handler(callback: CallbackQuery, session_maker: async_sessionmaker[AsyncSession]):
+async def show_portfolio_by_category_handler(callback: CallbackQuery, session: AsyncSession, category_cache: CategoryCache, card_cache: CardRenderCache, browse_snapshots: BrowseSnapshots, is_admin: bool):
     """Handler for displaying and navigating projects within the selected category."""
     
-    is_admin = callback.from_user.id == settings.ADMIN_ID 
     current_index = 0
+    cursor_id = None
+    direction = "next"
     
     # --- FIX for 'AttributeError' ---
     if callback.data.startswith('cat'):
@@ -236,9 +350,11 @@ async def show_portfolio_by_category_handler(callback: CallbackQuery, session_ma
         category_id = callback_data.category_id
         current_index = 0
     else:
-        # If it's a ProjectCallback (next/prev)
+        # If it's a ProjectCallback (next/prev): seek from the item currently on screen
         callback_data = ProjectCallback.unpack(callback.data)
         category_id = callback_data.category_id
+        cursor_id = callback_data.item_id
+        direction = callback_data.action
         
         if callback_data.action == "next":
             current_index = callback_data.current_index + 1
@@ -246,96 +362,137 @@ async def show_portfolio_by_category_handler(callback: CallbackQuery, session_ma
             current_index = callback_data.current_index - 1
     # ----------------------------------------------------
 
-    async with session_maker() as session:
-        # Build query: select only APPROVED projects
-        stmt = select(PortfolioItem).where(PortfolioItem.is_approved == True)
-        if category_id != 0:
-            stmt = stmt.where(PortfolioItem.category_id == category_id)
-        
-        # Get the total count
-        total_count_stmt = select(func.count(PortfolioItem.id)).where(PortfolioItem.is_approved == True)
-        if category_id != 0:
-            total_count_stmt = total_count_stmt.where(PortfolioItem.category_id == category_id)
-            
-        total_count = await session.scalar(total_count_stmt)
+    if cursor_id is None:
+        # Opening a category: materialize its ordered ids, so that paging reads them from Redis
+        await browse_snapshots.open(session, callback.from_user.id, category_id)
+    
+    # Snapshot lookup: neighbour ids from Redis + the project by primary key (cached)
+    snapshot_card = await browse_snapshots.fetch_card(
+        session, callback.from_user.id, category_id, current_index, step=-1 if direction == "prev" else 1
+    )
+    if snapshot_card is not None:
+        card, current_index = snapshot_card
+    else:
+        # No snapshot (expired) or beyond its stored part.
+        # One round trip: APPROVED project via the id cursor + category name + neighbours + total
+        BROWSE_CARDS.labels("seek").inc()
+        card = await fetch_project_card(
+            session, approved=True, category_id=category_id, cursor_id=cursor_id, direction=direction
+        )
+        if card is not None:
+            current_index = card.position(current_index)
 
-        if total_count == 0:
-            await callback.answer("There are no approved projects in this category yet 😟")
-            # Return to categories
-            await show_categories_handler(callback, session_maker)
-            return
+    if card is None:
+        await callback.answer("There are no approved projects in this category yet 😟")
+        # Return to categories
+        await show_categories_handler(callback, category_cache)
+        return
 
-        # Get the project object by index
-        stmt = stmt.limit(1).offset(current_index).order_by(PortfolioItem.id)
-        item = await session.scalar(stmt)
-        
-        category_name = "All Projects"
-        if category_id != 0:
-             cat = await session.get(Category, category_id)
-             if cat: category_name = cat.name
-             
-    caption = (
-        f"🗂️ Category: {category_name}\n"
-        f"💼 PROJECT ({current_index + 1}/{total_count}): {item.title}\n"
-        f"➖➖➖➖➖➖➖➖➖➖\n"
-        f"*{item.description}*"
-    )
+    item = card.item
+    total_count = card.total_count
+    category_name = card.category_name if category_id != 0 else "All Projects"
     
     # Pass category_id to the keyboard to maintain context
-    keyboard = get_project_navigation_keyboard(item, total_count, current_index, category_id, is_admin)
+    rendered = render_project_card(
+        card_cache, item, "portfolio", is_admin, category_name, category_id, current_index, total_count,
+        has_prev=card.prev_id is not None, has_next=card.next_id is not None
+    )
     
     await callback.answer()
     
-    # --- CHANGE: `item.telegram_file_id` -> `item.photo_file_id` ---
-    if item.photo_file_id:
-        try:
-            # Try to delete the previous message to send a photo
-            await callback.message.delete()
-        except Exception:
-            pass 
-            
-        await callback.message.answer_photo(
-            photo=item.photo_file_id, # --- CHANGE ---
-            caption=caption, 
-            reply_markup=keyboard, 
-            parse_mode='Markdown'
-        )
-    else:
-        await callback.message.edit_text(
-            caption, 
-            reply_markup=keyboard, 
-            parse_mode='Markdown'
-        )
+    # Edit the card in place (text or photo) where Telegram allows it
+    await present_card(callback.message, rendered)
 
 # --- NEW HANDLER: Send document via button ---
 @router.callback_query(ProjectCallback.filter(F.action == "get_doc"), StateFilter(None))
-async def send_project_document_handler(callback: CallbackQuery, callback_data: ProjectCallback, session_maker: async_sessionmaker[AsyncSession]):
+async def send_project_document_handler(callback: CallbackQuery, callback_data: ProjectCallback, session: AsyncSession):
     """Sends the document attached to the project."""
     await callback.answer("Loading document...")
     
-    async with session_maker() as session:
-        item = await session.get(PortfolioItem, callback_data.item_id)
-        
-        if item and item.document_file_id:
-            try:
-                # Send as a new message
-                await callback.message.answer_document(item.document_file_id)
-            except Exception as e:
-                await callback.answer(f"⛔️ Error sending file: {e}", show_alert=True)
-        else:
-            await callback.answer("⛔️ Document not found or was deleted.", show_alert=True)
+    item = await session.get(PortfolioItem, callback_data.item_id)
+    
+    if item and item.document_file_id:
+        try:
+            # Send as a new message
+            await callback.message.answer_document(item.document_file_id)
+        except Exception as e:
+            await callback.answer(f"⛔️ Error sending file: {e}", show_alert=True)
+    else:
+        await callback.answer("⛔️ Document not found or was deleted.", show_alert=True)
+
+# --- SEARCH (PUBLIC ACCESS) ---
+
+async def show_search_result(message: Message, state: FSMContext, session: AsyncSession, card_cache: CardRenderCache, index: int, is_admin: bool, replace: bool):
+    """Shows one search result as a project card. The ranked ids live in FSM data ('search_ids')."""
+    data = await state.get_data()
+    ids = data.get("search_ids") or []
+    
+    # Results are a snapshot: drop projects deleted or unpublished since the search
+    found = None
+    while ids:
+        index = max(0, min(index, len(ids) - 1))
+        found = await fetch_approved_item(session, ids[index])
+        if found is not None:
+            break
+        ids.pop(index)
+    if len(ids) != len(data.get("search_ids") or []):
+        await state.update_data(search_ids=ids)
+    
+    if found is None:
+        await message.answer("🔍 These search results are no longer available. Please run /search again.")
+        return
+    
+    item, category_name = found
+    rendered = render_project_card(card_cache, item, "search", is_admin, category_name, 0, index, len(ids))
+    await present_card(message, rendered, replace=replace)
+
+@router.message(Command("search"), StateFilter(None))
+async def command_search_handler(message: Message, command: CommandObject, state: FSMContext, session: AsyncSession, card_cache: CardRenderCache, is_admin: bool):
+    """/search <query> - ranked full-text search among approved projects."""
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer("Usage: <code>/search &lt;query&gt;</code>, e.g. <code>/search telegram bot</code>", parse_mode='HTML')
+        return
+    
+    # GIN-indexed full-text search with a trigram fallback; only the ranked ids are kept
+    ids = await search_project_ids(session, query, limit=settings.SEARCH_MAX_RESULTS)
+    if not ids:
+        await message.answer(f"🔍 Nothing found for \"{html.escape(query)}\". Try other words or browse the categories.", reply_markup=get_help_keyboard())
+        return
+    
+    await state.update_data(search_ids=ids, search_query=query)
+    await show_search_result(message, state, session, card_cache, 0, is_admin, replace=False)
+
+@router.callback_query(ProjectCallback.filter(F.action.in_({"search_next", "search_prev"})), StateFilter(None))
+async def search_results_page_handler(callback: CallbackQuery, callback_data: ProjectCallback, state: FSMContext, session: AsyncSession, card_cache: CardRenderCache, is_admin: bool):
+    """Pages through the stored search results."""
+    step = 1 if callback_data.action == "search_next" else -1
+    await callback.answer()
+    await show_search_result(callback.message, state, session, card_cache, callback_data.current_index + step, is_admin, replace=True)
+
+# --- INLINE MODE (@bot query from any chat) ---
+
+@router.inline_query()
+async def inline_portfolio_handler(inline_query: InlineQuery, inline_results: InlineResultsCache):
+    """Answers inline queries from precomputed result sets (Redis), not from Postgres per keystroke."""
+    results = await inline_results.get_results(inline_query.query)
+    await inline_query.answer(
+        [get_inline_result(project) for project in results],
+        # Results are the same for everyone, so Telegram may share its cache between users
+        cache_time=settings.INLINE_CACHE_TIME,
+        is_personal=False
+    )
 
 # --- FSM FOR USER (PUBLIC ACCESS) ---
 
 @router.message(Command("add_project"), StateFilter(None))
 @router.callback_query(F.data == "start_user_add_project", StateFilter(None)) 
-async def command_add_project_handler(union: Message | CallbackQuery, state: FSMContext, session_maker: async_sessionmaker[AsyncSession]):
+async def command_add_project_handler(union: Message | CallbackQuery, state: FSMContext, category_cache: CategoryCache):
     """Start FSM: Ask for category."""
     
     message_to_edit = union.message if isinstance(union, CallbackQuery) else union
     
-    async with session_maker() as session:
-        keyboard = await get_categories_keyboard(session)
+    keyboard = await category_cache.get_keyboard()
         
     # --- CHANGE: Step 1/6 ---
     step_text = "➡️ SUGGESTING YOUR PROJECT\n\n" \
@@ -431,7 +588,7 @@ async def user_process_project_photo(message: Message, state: FSMContext):
 
 # --- NEW HANDLER: Step 6 - Get Document ---
 @router.message(UserAddProjectStates.get_document, F.document | F.text)
-async def user_process_project_document(message: Message, state: FSMContext, session_maker: async_sessionmaker[AsyncSession]):
+async def user_process_project_document(message: Message, state: FSMContext, session: AsyncSession, user_buffer: UserRegistrationBuffer):
     
     doc_file_id = None
     if message.document:
@@ -456,9 +613,12 @@ async def user_process_project_document(message: Message, state: FSMContext, ses
         is_approved=False # Project is NOT APPROVED by default
     )
 
-    async with session_maker() as session:
-        session.add(new_item)
-        await session.commit()
+    # portfolio_items.user_id references users.user_id: make sure a fresh /start is already written
+    await user_buffer.flush()
+
+    session.add(new_item)
+    await bump_counters(session, project_deltas(new_item.category_id, is_approved=False, delta=1))
+    await session.commit()
 
     # * KEY POINT: Moderation message *
     await message.answer(
@@ -501,52 +661,46 @@ async def admin_panel_handler(message: Message):
 # --- 1. STATISTICS LOGIC ---
 
 @admin_router.callback_query(F.data.in_({'admin_stats', 'admin_list_users'}))
-async def admin_stats_handler(callback: CallbackQuery, session_maker: async_sessionmaker[AsyncSession]): 
+async def admin_stats_handler(callback: CallbackQuery, session: AsyncSession): 
     """Displays detailed statistics on users and projects."""
     
     await callback.answer("Gathering statistics...")
     
-    async with session_maker() as session:
-        total_users_stmt = select(func.count(User.id))
-        total_users = await session.scalar(total_users_stmt)
-        
-        total_projects_stmt = select(func.count(PortfolioItem.id))
-        total_projects = await session.scalar(total_projects_stmt)
-        
-        # Count approved projects
-        approved_projects_stmt = select(func.count(PortfolioItem.id)).where(PortfolioItem.is_approved == True)
-        approved_projects = await session.scalar(approved_projects_stmt)
+    # All three numbers come from maintained counters in one primary-key lookup
+    counters = await get_counters(session, USERS, approved_key(), pending_key())
+    total_users = counters[USERS]
+    approved_projects = counters[approved_key()]
+    pending_projects = counters[pending_key()]
+    total_projects = approved_projects + pending_projects
+
+    if callback.data == 'admin_list_users':
+        user_list_stmt = select(User.user_id, User.username).order_by(User.id.desc()).limit(10)
+        user_list_result = await session.execute(user_list_stmt)
+        users_data = user_list_result.all()
         
-        pending_projects = total_projects - approved_projects
-
-        if callback.data == 'admin_list_users':
-            user_list_stmt = select(User.user_id, User.username).order_by(User.id.desc()).limit(10)
-            user_list_result = await session.execute(user_list_stmt)
-            users_data = user_list_result.all()
-            
-            user_details = "\n".join(
-                [f"• <code>@{u[1]}</code> (ID: <code>{u[0]}</code>)" if u[1] else f"• ID: <code>{u[0]}</code>" 
-                 for u in users_data]
-            )
-            stats_text = (
-                f"📊 BOT STATISTICS\n"
-                f"➖➖➖➖➖➖➖➖➖➖\n"
-                f"• Total users: {total_users}\n"
-                f"• Total projects (all): {total_projects}\n"
-                f"• Approved: {approved_projects}\n"
-                f"• Pending moderation: {pending_projects}\n"
-                f"➖➖➖➖➖➖➖➖➖➖\n"
-                f"LAST 10 USERS:\n{user_details}"
-            )
-        else:
-            stats_text = (
-                f"📊 BOT STATISTICS\n"
-                f"➖➖➖➖➖➖➖➖➖➖\n"
-                f"• Total users: {total_users}\n"
-                f"• Total projects (all): {total_projects}\n"
-                f"• Approved: {approved_projects}\n"
-                f"• Pending moderation: {pending_projects}"
-            )
+        user_details = "\n".join(
+            [f"• <code>@{u[1]}</code> (ID: <code>{u[0]}</code>)" if u[1] else f"• ID: <code>{u[0]}</code>" 
+             for u in users_data]
+        )
+        stats_text = (
+            f"📊 BOT STATISTICS\n"
+            f"➖➖➖➖➖➖➖➖➖➖\n"
+            f"• Total users: {total_users}\n"
+            f"• Total projects (all): {total_projects}\n"
+            f"• Approved: {approved_projects}\n"
+            f"• Pending moderation: {pending_projects}\n"
+            f"➖➖➖➖➖➖➖➖➖➖\n"
+            f"LAST 10 USERS:\n{user_details}"
+        )
+    else:
+        stats_text = (
+            f"📊 BOT STATISTICS\n"
+            f"➖➖➖➖➖➖➖➖➖➖\n"
+            f"• Total users: {total_users}\n"
+            f"• Total projects (all): {total_projects}\n"
+            f"• Approved: {approved_projects}\n"
+            f"• Pending moderation: {pending_projects}"
+        )
 
     await callback.message.edit_text(
         stats_text,
@@ -634,7 +788,7 @@ async def admin_process_project_photo(message: Message, state: FSMContext):
 
 # --- NEW HANDLER: Step 6 - Get Document (Admin) ---
 @admin_router.message(AddProjectStates.get_document, F.document | F.text)
-async def admin_process_project_document(message: Message, state: FSMContext, session_maker: async_sessionmaker[AsyncSession]):
+async def admin_process_project_document(message: Message, state: FSMContext, session: AsyncSession, inline_results: InlineResultsCache):
     
     doc_file_id = None
     if message.document:
@@ -658,9 +812,10 @@ async def admin_process_project_document(message: Message, state: FSMContext, se
         is_approved=True # Admin's project is approved automatically
     )
 
-    async with session_maker() as session:
-        session.add(new_item)
-        await session.commit()
+    session.add(new_item)
+    await bump_counters(session, project_deltas(new_item.category_id, is_approved=True, delta=1))
+    await session.commit()
+    await inline_results.invalidate(new_item.category_id)
 
     await message.answer(
         f"✅ Project '{data['title']}' successfully added to the database!",
@@ -681,203 +836,283 @@ async def admin_process_project_photo_invalid(message: Message):
 
 # --- 3. PROJECT MODERATION LOGIC (ADMIN) ---
 
-# --- NEW HANDLER: Send Document (Admin) ---
-@admin_router.callback_query(ProjectCallback.filter(F.action == "get_doc"))
-async def admin_send_project_document_handler(callback: CallbackQuery, callback_data: ProjectCallback, session_maker: async_sessionmaker[AsyncSession]):
-    """Sends the document attached to the project (for admin)."""
-    await callback.answer("Loading document...")
-    
-    async with session_maker() as session:
-        item = await session.get(PortfolioItem, callback_data.item_id)
-        
-        if item and item.document_file_id:
-            try:
-                await callback.message.answer_document(item.document_file_id)
-            except Exception as e:
-                await callback.answer(f"⛔️ Error sending file: {e}", show_alert=True)
-        else:
-            await callback.answer("⛔️ Document not found or was deleted.", show_alert=True)
-
 @admin_router.callback_query(F.data == "admin_moderate_list")
-@admin_router.callback_query(ProjectCallback.filter(F.action.in_({"next", "prev"})))
-async def admin_moderate_list_handler(callback: CallbackQuery, session_maker: async_sessionmaker[AsyncSession], callback_data=None):
-    """Shows the list of projects awaiting moderation."""
-    
-    is_admin = callback.from_user.id == settings.ADMIN_ID 
-    current_index = 0
+@admin_router.callback_query(ProjectCallback.filter(F.action == "mod_next"))
+async def admin_moderate_list_handler(callback: CallbackQuery, session: AsyncSession, card_cache: CardRenderCache, category_cache: CategoryCache, callback_data: ProjectCallback | None = None):
+    """
+    Shows the next project from the moderation queue, leased to this moderator.
+    Concurrent moderators get different projects; an abandoned lease expires and the project returns to the queue.
+    """
     
-    if callback.data != "admin_moderate_list":
-        # If it's a ProjectCallback (next/prev)
-        callback_data = ProjectCallback.unpack(callback.data)
-        if callback_data.action == "next":
-            current_index = callback_data.current_index + 1
-        else: # action == "prev"
-            current_index = callback_data.current_index - 1
-        
-    async with session_maker() as session:
-        # * KEY POINT: Select only NON-APPROVED projects *
-        stmt = select(PortfolioItem).where(PortfolioItem.is_approved == False)
-        
-        total_count_stmt = select(func.count(PortfolioItem.id)).where(PortfolioItem.is_approved == False)
-        total_count = await session.scalar(total_count_stmt)
-
-        if total_count == 0:
-            await callback.answer("✅ No new projects pending moderation.", show_alert=True)
-          
-            # ИСПРАВЛЕНИЕ: Вместо сложного редактирования используем удаление и новую отправку
-            try:
-                await callback.message.delete()
-            except Exception:
-                pass
-            
-            await callback.message.answer(
-                "🔐 <b>Admin Panel:</b> Select an action.", 
-                reply_markup=get_admin_main_keyboard(), 
-                parse_mode='HTML'
-            )
-            return
+    # Opening the queue starts from the oldest free project;
+    # 'mod_next' (skip), 'approve' and 'reject' continue after the current one (wrapping at the end)
+    after_id = callback_data.item_id if callback_data is not None else None
+    item = await lease_next_pending(
+        session, callback.from_user.id, after_id=after_id, lease_seconds=settings.MODERATION_LEASE_SECONDS
+    )
 
-        # Get the project object
-        stmt = stmt.limit(1).offset(current_index).order_by(PortfolioItem.id)
-        item = await session.scalar(stmt)
+    if item is None:
+        await callback.answer("✅ No free projects pending moderation.", show_alert=True)
+      
+        # ИСПРАВЛЕНИЕ: Вместо сложного редактирования используем удаление и новую отправку
+        try:
+            await callback.message.delete()
+        except Exception:
+            pass
         
-        category_name = await session.scalar(select(Category.name).where(Category.id == item.category_id))
+        await callback.message.answer(
+            "🔐 <b>Admin Panel:</b> Select an action.", 
+            reply_markup=get_admin_main_keyboard(), 
+            parse_mode='HTML'
+        )
+        return
+
+    # Commit the lease right away: other moderators skip this project from now on,
+    # and the row lock is not held while the card is sent to Telegram
+    await session.commit()
+
+    total_count = await get_counter(session, pending_key(0))
+    category_name = await category_cache.get_name(item.category_id) or "Unknown"
         
-    # Format the message for moderation
-    caption = (
-        f"🚨 MODERATION ({current_index + 1}/{total_count}):\n"
-        f"🗂️ Category: {category_name}\n"
-        f"📝 Title: {item.title}\n"
-        f"👤 Added by: <code>{item.user_id}</code>\n"
-        f"➖➖➖➖➖➖➖➖➖➖\n"
-        f"*{item.description}*"
+    # Moderation caption and keyboard (with the approve/reject row) come from the render cache
+    rendered = render_project_card(
+        card_cache, item, "moderation", True, category_name, 0, 0, total_count,
+        has_prev=False, has_next=total_count > 1
     )
-    
-    # Navigation keyboard
-    keyboard = get_project_navigation_keyboard(
-        item=item, 
-        total_count=total_count, 
-        current_index=current_index, 
-        category_id=0,
-        is_admin=is_admin,
-        is_moderator_view=True # Use the moderation keyboard layout
-    )
-    
-    moderate_row = [
-            InlineKeyboardButton(
-                text="✅ APPROVE", 
-                callback_data=ProjectCallback(action="approve", item_id=item.id, current_index=current_index, category_id=0).pack()
-            ),
-            InlineKeyboardButton(
-                text="❌ REJECT", 
-                callback_data=ProjectCallback(action="reject", item_id=item.id, current_index=current_index, category_id=0).pack()
-            )
-        ]
-        # Insert moderation buttons BEFORE the back button
-    keyboard.inline_keyboard.insert(-1, moderate_row)
-        
-    await callback.answer()
         
-        # --- CHANGE: `item.telegram_file_id` -> `item.photo_file_id` ---
-    if item.photo_file_id:
-            try:
-                await callback.message.delete()
-            except Exception:
-                pass 
-                
-            await callback.message.answer_photo(
-                photo=item.photo_file_id, 
-                caption=caption, 
-                reply_markup=keyboard, 
-                parse_mode='Markdown'
-            )
+    if callback_data is not None and callback_data.action == "mod_next" and item.id == callback_data.item_id:
+        await callback.answer("No other free projects in the queue.")
     else:
-            await callback.message.edit_text(
-                caption, 
-                reply_markup=keyboard, 
-                parse_mode='Markdown'
-            )
+        await callback.answer()
+    
+    await present_card(callback.message, rendered)
 
 # --- NEW HANDLER: Approve Project ---
 @admin_router.callback_query(ProjectCallback.filter(F.action == "approve"))
-async def admin_approve_project_handler(callback: CallbackQuery, callback_data: ProjectCallback, session_maker: async_sessionmaker[AsyncSession]):
+async def admin_approve_project_handler(callback: CallbackQuery, callback_data: ProjectCallback, session: AsyncSession, notifier: NotificationQueue, card_cache: CardRenderCache, category_cache: CategoryCache, inline_results: InlineResultsCache):
     """Approves the project and notifies the user."""
     
-    async with session_maker() as session:
-        item = await session.get(PortfolioItem, callback_data.item_id)
-        
-        if not item:
-            await callback.answer("⛔️ Project not found (perhaps deleted).", show_alert=True)
-            return
-        
-        if item.is_approved:
-            await callback.answer("✅ This project has already been approved.", show_alert=True)
-            return
+    # Claim: the conditional UPDATE succeeds for exactly one of concurrent approve/reject clicks
+    # and never for a project leased to another moderator
+    row = await claim_approve(session, callback_data.item_id, callback.from_user.id)
+    
+    if row is None:
+        await callback.answer("⛔️ This project was already handled (or is reserved) by another moderator.", show_alert=True)
+        await admin_moderate_list_handler(callback, session, card_cache, category_cache, callback_data)
+        return
 
-        item.is_approved = True
-        await session.commit()
-        
-        await callback.answer(f"✅ Project '{item.title}' APPROVED!", show_alert=True)
-        
-        # Notify the user
-        try:
-            await callback.bot.send_message(
-                chat_id=item.user_id,
-                text=f"🎉 Congratulations! Your project '{item.title}' has passed moderation and been added to the portfolio!",
-                parse_mode='Markdown'
-            )
-        except Exception as e:
-            print(f"Failed to notify user {item.user_id}: {e}")
+    # Commit before queuing the notification; the list below reuses this session in a new transaction
+    await session.commit()
+    card_cache.invalidate_item(row.id)
+    await inline_results.invalidate(row.category_id)
+    
+    await callback.answer(f"✅ Project '{row.title}' APPROVED!", show_alert=True)
+    
+    # Notify the user (queued: rate-limited and persisted in Redis, the click does not wait for it)
+    await notifier.enqueue(
+        chat_id=row.user_id,
+        text=get_approved_notification_text(row.title),
+        parse_mode='Markdown'
+    )
 
     # Refresh the moderation message (return to the list)
-    await admin_moderate_list_handler(callback, session_maker, callback_data)
+    await admin_moderate_list_handler(callback, session, card_cache, category_cache, callback_data)
 
 # --- NEW HANDLER: Reject Project ---
 @admin_router.callback_query(ProjectCallback.filter(F.action == "reject"))
-async def admin_reject_project_handler(callback: CallbackQuery, callback_data: ProjectCallback, session_maker: async_sessionmaker[AsyncSession]):
+async def admin_reject_project_handler(callback: CallbackQuery, callback_data: ProjectCallback, session: AsyncSession, notifier: NotificationQueue, card_cache: CardRenderCache, category_cache: CategoryCache, inline_results: InlineResultsCache):
     """Rejects (deletes) the project and notifies the user."""
     
-    async with session_maker() as session:
-        item = await session.get(PortfolioItem, callback_data.item_id)
-        
-        if not item:
-            await callback.answer("⛔️ Project not found (perhaps already deleted).", show_alert=True)
-            return
+    # Claim: DELETE ... WHERE is_approved = false - a project approved meanwhile is not deleted
+    row = await claim_reject(session, callback_data.item_id, callback.from_user.id)
+    
+    if row is None:
+        await callback.answer("⛔️ This project was already handled (or is reserved) by another moderator.", show_alert=True)
+        await admin_moderate_list_handler(callback, session, card_cache, category_cache, callback_data)
+        return
 
-        title_for_notification = item.title
-        user_id_for_notification = item.user_id
-        
-        await session.delete(item)
-        await session.commit()
-        
-        await callback.answer(f"❌ Project '{title_for_notification}' REJECTED and DELETED.", show_alert=True)
+    await session.commit()
+    card_cache.invalidate_item(row.id)
+    await inline_results.invalidate(row.category_id)
+    
+    await callback.answer(f"❌ Project '{row.title}' REJECTED and DELETED.", show_alert=True)
 
-        try:
-            await callback.bot.send_message(
-                chat_id=user_id_for_notification,
-                text=f"❌ Unfortunately, your project '{title_for_notification}' was rejected by the moderator.",
-                parse_mode='Markdown'
-            )
-        except Exception as e:
-            print(f"Failed to notify user {user_id_for_notification}: {e}")
+    await notifier.enqueue(
+        chat_id=row.user_id,
+        text=get_rejected_notification_text(row.title),
+        parse_mode='Markdown'
+    )
 
-    await admin_moderate_list_handler(callback, session_maker, callback_data)
+    await admin_moderate_list_handler(callback, session, card_cache, category_cache, callback_data)
 
 @admin_router.callback_query(ProjectCallback.filter(F.action == "delete"))
-async def admin_delete_project_handler(callback: CallbackQuery, callback_data: ProjectCallback, session_maker: async_sessionmaker[AsyncSession]):
+async def admin_delete_project_handler(callback: CallbackQuery, callback_data: ProjectCallback, session: AsyncSession, category_cache: CategoryCache, card_cache: CardRenderCache, browse_snapshots: BrowseSnapshots, inline_results: InlineResultsCache):
     """Deletes a project (for admin, from the general list)."""
     
-    async with session_maker() as session:
-        item = await session.get(PortfolioItem, callback_data.item_id)
-        
-        if not item:
-            await callback.answer("⛔️ Project already deleted.", show_alert=True)
-            return
+    # DELETE ... RETURNING: of two concurrent deletes only one gets the row (and adjusts the counters)
+    row = await claim_delete(session, callback_data.item_id)
+    
+    if row is None:
+        await callback.answer("⛔️ Project already deleted.", show_alert=True)
+        return
 
-        title = item.title
-        await session.delete(item)
-        await session.commit()
-        
-        await callback.answer(f"✅ Project '{title}' deleted.", show_alert=True)
-        
-        await show_categories_handler(callback, session_maker)
\ No newline at end of file
+    title = row.title
+    await session.commit()
+    card_cache.invalidate_item(callback_data.item_id)
+    await browse_snapshots.invalidate_item(callback_data.item_id)
+    # A deleted approved project must also leave the inline result sets
+    await inline_results.invalidate(row.category_id, removed=row.is_approved)
+    
+    await callback.answer(f"✅ Project '{title}' deleted.", show_alert=True)
+    
+    await show_categories_handler(callback, category_cache)
+
+# --- 4. BULK MODERATION LOGIC (ADMIN) ---
+
+async def show_bulk_selection(message: Message, state: FSMContext, session: AsyncSession, category_id: int = 0, user_id: int | None = None, edit: bool = False):
+    """Selects pending projects by filter, remembers their ids and asks for confirmation."""
+    ids = await select_pending_ids(session, category_id=category_id, user_id=user_id, limit=settings.BULK_MODERATION_LIMIT)
+
+    if not ids:
+        text, keyboard = "✅ No pending projects match this filter.", get_admin_main_keyboard()
+    else:
+        # The exact selection is applied later, so new submissions never get approved unseen
+        await state.update_data(bulk_ids=ids)
+        limit_note = f" (limit {settings.BULK_MODERATION_LIMIT} reached, repeat for the rest)" if len(ids) == settings.BULK_MODERATION_LIMIT else ""
+        text = (
+            f"📦 BULK MODERATION\n"
+            f"➖➖➖➖➖➖➖➖➖➖\n"
+            f"Selected: {len(ids)} pending project(s){limit_note}.\n"
+            f"Apply the action to all of them?"
+        )
+        keyboard = get_bulk_confirm_keyboard()
+
+    if edit:
+        await message.edit_text(text, reply_markup=keyboard, parse_mode='HTML')
+    else:
+        await message.answer(text, reply_markup=keyboard, parse_mode='HTML')
+
+@admin_router.callback_query(F.data == "admin_bulk_menu")
+async def admin_bulk_menu_handler(callback: CallbackQuery, session: AsyncSession, category_cache: CategoryCache):
+    """Shows the bulk moderation filters with pending counts per category."""
+    await callback.answer()
+    
+    categories = await category_cache.get_categories()
+    counters = await get_counters(session, pending_key(0), *(pending_key(category_id) for category_id, _ in categories))
+    pending = {0: counters[pending_key(0)], **{category_id: counters[pending_key(category_id)] for category_id, _ in categories}}
+    
+    text = (
+        "📦 <b>Bulk Moderation:</b> select which pending projects to process.\n"
+        "To select the projects of one submitter use <code>/bulk user &lt;telegram_id&gt;</code>."
+    )
+    keyboard = get_bulk_filter_keyboard(categories, pending)
+    if callback.message.photo:
+        try:
+            await callback.message.delete()
+        except TelegramBadRequest:
+            pass  # Already deleted or too old to delete - a new message is sent anyway
+        await callback.message.answer(text, reply_markup=keyboard, parse_mode='HTML')
+    else:
+        await callback.message.edit_text(text, reply_markup=keyboard, parse_mode='HTML')
+
+@admin_router.message(Command("bulk"))
+async def admin_bulk_command_handler(message: Message, command: CommandObject, state: FSMContext, session: AsyncSession):
+    """/bulk [all | cat <category_id> | user <telegram_id>] - select pending projects for bulk moderation."""
+    args = (command.args or "all").split()
+    
+    if args == ["all"]:
+        await show_bulk_selection(message, state, session)
+    elif len(args) == 2 and args[0] in ("cat", "user") and args[1].isdigit():
+        if args[0] == "cat":
+            await show_bulk_selection(message, state, session, category_id=int(args[1]))
+        else:
+            await show_bulk_selection(message, state, session, user_id=int(args[1]))
+    else:
+        await message.answer(
+            "Usage: <code>/bulk all</code>, <code>/bulk cat &lt;category_id&gt;</code> or <code>/bulk user &lt;telegram_id&gt;</code>",
+            parse_mode='HTML'
+        )
+
+@admin_router.callback_query(BulkModerationCallback.filter(F.action == "select"))
+async def admin_bulk_select_handler(callback: CallbackQuery, callback_data: BulkModerationCallback, state: FSMContext, session: AsyncSession):
+    await callback.answer()
+    await show_bulk_selection(callback.message, state, session, category_id=callback_data.category_id, edit=True)
+
+@admin_router.callback_query(BulkModerationCallback.filter(F.action.in_({"approve", "reject"})))
+async def admin_bulk_apply_handler(callback: CallbackQuery, callback_data: BulkModerationCallback, state: FSMContext, session: AsyncSession, notifier: NotificationQueue, card_cache: CardRenderCache, inline_results: InlineResultsCache):
+    """Approves or rejects the whole selection in one transaction and queues the notifications."""
+    data = await state.get_data()
+    ids = data.pop("bulk_ids", None)
+    if not ids:
+        await callback.answer("⛔️ The selection has expired. Please select the projects again.", show_alert=True)
+        return
+    await state.set_data(data)
+    
+    approve = callback_data.action == "approve"
+    # UPDATE/DELETE ... WHERE id = ANY(:ids) - one statement, one commit;
+    # projects leased to another moderator in the moderation queue are skipped
+    rows = await (bulk_approve if approve else bulk_reject)(session, ids, moderator_id=callback.from_user.id)
+    await session.commit()
+    for row in rows:
+        card_cache.invalidate_item(row.id)
+    for category_id in {row.category_id for row in rows}:
+        await inline_results.invalidate(category_id)
+    
+    # Notifications go to the rate-limited queue in one batch
+    text_for = get_approved_notification_text if approve else get_rejected_notification_text
+    await notifier.enqueue_many([(row.user_id, text_for(row.title)) for row in rows], parse_mode='Markdown')
+    
+    verb = "APPROVED" if approve else "REJECTED and DELETED"
+    skipped = len(ids) - len(rows)
+    skipped_note = f" ({skipped} already handled or reserved by someone else)" if skipped else ""
+    await callback.answer(f"✅ {len(rows)} project(s) {verb}{skipped_note}.", show_alert=True)
+    await callback.message.edit_text(
+        "🔐 <b>Admin Panel:</b> Select an action.", 
+        reply_markup=get_admin_main_keyboard(), 
+        parse_mode='HTML'
+    )
+
+@admin_router.callback_query(BulkModerationCallback.filter(F.action == "cancel"))
+async def admin_bulk_cancel_handler(callback: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    data.pop("bulk_ids", None)
+    await state.set_data(data)
+    
+    await callback.answer("Bulk moderation cancelled.")
+    await callback.message.edit_text(
+        "🔐 <b>Admin Panel:</b> Select an action.", 
+        reply_markup=get_admin_main_keyboard(), 
+        parse_mode='HTML'
+    )
+
+# --- 5. ROLE MANAGEMENT (OWNER) ---
+
+@admin_router.message(Command("promote", "demote"))
+async def admin_set_role_handler(message: Message, command: CommandObject, session: AsyncSession, role_cache: RoleCache, user_buffer: UserRegistrationBuffer):
+    """/promote <telegram_id>, /demote <telegram_id> - grant or revoke moderator (admin) rights. Owner only."""
+    if message.from_user.id != settings.ADMIN_ID:
+        await message.answer("⛔️ Only the bot owner can change roles.")
+        return
+    
+    args = (command.args or "").split()
+    if len(args) != 1 or not args[0].isdigit():
+        await message.answer(f"Usage: <code>/{command.command} &lt;telegram_id&gt;</code>", parse_mode='HTML')
+        return
+    
+    user_id = int(args[0])
+    make_admin = command.command == "promote"
+    if not make_admin and user_id == settings.ADMIN_ID:
+        await message.answer("⛔️ The bot owner cannot be demoted.")
+        return
+    
+    # A fresh /start may still be waiting in the write-behind buffer
+    await user_buffer.flush()
+    if not await role_cache.set_role(session, user_id, make_admin):
+        await message.answer("⛔️ User not found. They need to /start the bot first.")
+        return
+    await session.commit()
+    # Every process refreshes its in-memory role set via Redis pub/sub
+    await role_cache.notify_changed()
+    
+    verb = "is now a moderator" if make_admin else "is no longer a moderator"
+    await message.answer(f"✅ User <code>{user_id}</code> {verb}.", parse_mode='HTML')
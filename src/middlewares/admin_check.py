@@ -1,26 +1,49 @@
 # src/middlewares/admin_check.py
 from aiogram import BaseMiddleware
-from aiogram.types import Message
+from aiogram.types import Message, CallbackQuery, TelegramObject, User
 from typing import Callable, Dict, Any, Awaitable
-from src.config import settings # Импортируем наш конфиг
+
+from src.services.role_cache import RoleCache
+
+
+class RoleMiddleware(BaseMiddleware):
+    """
+    Внешняя мидлварь Диспетчера: определяет роль пользователя по RoleCache (в памяти,
+    без запроса к БД) и передает хэндлерам флаг `is_admin`.
+    """
+    def __init__(self, role_cache: RoleCache):
+        self.role_cache = role_cache
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        data["is_admin"] = user is not None and self.role_cache.is_admin(user.id)
+        return await handler(event, data)
+
 
 class AdminMiddleware(BaseMiddleware):
     """
-    Мидлварь для проверки, является ли пользователь администратором,
-    сравнивая его ID с ADMIN_ID из конфига.
+    Мидлварь для проверки, является ли пользователь администратором.
+    Работает и для сообщений, и для callback-запросов; роль уже определена RoleMiddleware.
     """
     async def __call__(
         self,
-        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
-        event: Message,
+        handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: Message | CallbackQuery,
         data: Dict[str, Any]
-    ) -> Awaitable[Any]:
-        
-        # Проверяем, что ID пользователя совпадает с ID админа из .env
-        if event.from_user.id != settings.ADMIN_ID:
+    ) -> Any:
+
+        if not data.get("is_admin"):
             # Если нет - вежливо отвечаем и прекращаем обработку
-            await event.answer("⛔️ У вас нет доступа к этой команде.")
+            if isinstance(event, CallbackQuery):
+                await event.answer("⛔️ У вас нет доступа к этому действию.", show_alert=True)
+            else:
+                await event.answer("⛔️ У вас нет доступа к этой команде.")
             return
-        
-        # Если ID совпал - продолжаем выполнение хэндлера
-        return await handler(event, data)
\ No newline at end of file
+
+        # Если пользователь - администратор, продолжаем выполнение хэндлера
+        return await handler(event, data)
@@ -0,0 +1,91 @@
+# src/middlewares/concurrency.py
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from src.services.metrics import UPDATES_WAITING, UPDATES_IN_PROGRESS, UPDATE_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """
+    Внешняя мидлварь Диспетчера (dp.update.outer_middleware): одновременно
+    обрабатывается не больше max_concurrency апдейтов.
+
+    aiogram запускает каждый апдейт отдельной задачей (polling: handle_as_tasks,
+    webhook: handle_in_background), поэтому медленный хэндлер не задерживает чужие апдейты.
+    Порядок апдейтов одного чата обеспечивает не эта мидлварь, а events_isolation
+    Диспетчера (OrderedEventIsolation: FIFO в процессе + замок Redis): замок берется до чтения состояния FSM и
+    действует во всех процессах.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        # --- Метрики backpressure ---
+        self.waiting = 0        # Апдейты в очереди (ждут свободный слот)
+        self.in_progress = 0    # Апдейты, которые обрабатываются прямо сейчас
+        self.processed = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0  # Максимум с момента последнего снимка stats()
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        started = time.monotonic()
+        self.waiting += 1
+        UPDATES_WAITING.inc()
+        acquired = False
+        try:
+            async with self._semaphore:
+                acquired = True
+                self.waiting -= 1
+                UPDATES_WAITING.dec()
+                self._observe_wait(time.monotonic() - started)
+
+                self.in_progress += 1
+                UPDATES_IN_PROGRESS.inc()
+                try:
+                    return await handler(event, data)
+                finally:
+                    self.in_progress -= 1
+                    UPDATES_IN_PROGRESS.dec()
+                    self.processed += 1
+        finally:
+            # Апдейт отменили, пока он стоял в очереди
+            if not acquired:
+                self.waiting -= 1
+                UPDATES_WAITING.dec()
+
+    def _observe_wait(self, wait_time: float):
+        UPDATE_WAIT.observe(wait_time)
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+    def stats(self) -> dict[str, float]:
+        """Снимок метрик backpressure (сбрасывает max_wait)."""
+        snapshot = {
+            "limit": self.max_concurrency,
+            "waiting": self.waiting,
+            "in_progress": self.in_progress,
+            "processed": self.processed,
+            "avg_wait_ms": round(1000 * self.total_wait_time / self.processed, 2) if self.processed else 0.0,
+            "max_wait_ms": round(1000 * self.max_wait_time, 2),
+        }
+        self.max_wait_time = 0.0
+        return snapshot
+
+    async def log_stats(self, interval: float):
+        """Фоновая задача: периодически пишет метрики backpressure в лог."""
+        while True:
+            await asyncio.sleep(interval)
+            logger.info(f"Update processing stats: {self.stats()}")
@@ -0,0 +1,39 @@
+# src/middlewares/db_session.py
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Внешняя мидлварь Диспетчера: одна сессия БД на апдейт (аргумент хэндлера `session`).
+
+    Сессия ленивая: соединение берется из пула только при первом запросе, поэтому
+    апдейты без обращений к БД пул не трогают. Вложенные вызовы хэндлеров используют
+    ту же сессию и транзакцию. В конце апдейта открытая транзакция фиксируется,
+    при исключении - откатывается.
+
+    Хэндлер может сам вызвать session.commit() раньше (например, перед отправкой
+    уведомлений) - соединение вернется в пул, а следующий запрос откроет новую транзакцию.
+    """
+    def __init__(self, session_maker: async_sessionmaker[AsyncSession]):
+        self.session_maker = session_maker
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        async with self.session_maker() as session:
+            data["session"] = session
+            try:
+                result = await handler(event, data)
+            except Exception:
+                await session.rollback()
+                raise
+            if session.in_transaction():
+                await session.commit()
+            return result
@@ -0,0 +1,83 @@
+# src/middlewares/metrics.py
+import time
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject, CallbackQuery, Message
+
+from src.database.instrumentation import set_current_handler
+from src.services.metrics import (
+    HANDLER_LATENCY, HANDLER_ERRORS, HANDLER_IN_FLIGHT,
+    TELEGRAM_API_LATENCY, TELEGRAM_API_ERRORS,
+)
+
+
+def _handler_action(event: TelegramObject, data: Dict[str, Any]) -> str:
+    """
+    Действие для метки метрики с ограниченным набором значений:
+    action из CallbackData (ProjectCallback и т.п.), простая строка callback_data
+    или команда сообщения.
+    """
+    callback_data = data.get("callback_data")
+    if callback_data is not None:
+        return getattr(callback_data, "action", None) or callback_data.__prefix__
+    if isinstance(event, CallbackQuery) and event.data:
+        # Упакованные CallbackData содержат ID - в метку идет только префикс
+        return event.data.split(":", 1)[0]
+    command = data.get("command")
+    if command is not None:
+        return f"/{command.command}"
+    if isinstance(event, Message):
+        return "message"
+    return ""
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Внутренняя мидлварь роутеров: латентность, ошибки и число выполняющихся
+    хэндлеров с метками (имя хэндлера, action).
+    """
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+        action = _handler_action(event, data)
+        set_current_handler(name)
+
+        in_flight = HANDLER_IN_FLIGHT.labels(name)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            HANDLER_ERRORS.labels(name, action, type(e).__name__).inc()
+            raise
+        finally:
+            HANDLER_LATENCY.labels(name, action).observe(time.perf_counter() - started)
+            in_flight.dec()
+
+
+class TelegramApiMetricsMiddleware(BaseRequestMiddleware):
+    """Мидлварь сессии бота: латентность и ошибки каждого запроса к Bot API."""
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        api_method = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            TELEGRAM_API_ERRORS.labels(api_method, type(e).__name__).inc()
+            raise
+        finally:
+            TELEGRAM_API_LATENCY.labels(api_method).observe(time.perf_counter() - started)
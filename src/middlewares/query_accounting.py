@@ -0,0 +1,40 @@
+# src/middlewares/query_accounting.py
+import logging
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from src.database.instrumentation import QueryStats, current_query_stats
+from src.services.metrics import DB_QUERIES_PER_UPDATE, DB_TIME_PER_UPDATE
+
+logger = logging.getLogger(__name__)
+
+
+class QueryAccountingMiddleware(BaseMiddleware):
+    """
+    Внешняя мидлварь Диспетчера: считает SQL-запросы и время в БД на каждый апдейт
+    и пишет их в метрики и лог (на уровне log_level).
+    """
+    def __init__(self, log_level: int = logging.DEBUG):
+        self.log_level = log_level
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        try:
+            return await handler(event, data)
+        finally:
+            current_query_stats.reset(token)
+            DB_QUERIES_PER_UPDATE.labels(stats.handler).observe(stats.queries)
+            DB_TIME_PER_UPDATE.labels(stats.handler).observe(stats.db_time)
+            logger.log(
+                self.log_level,
+                f"Update {event.update_id} handled by {stats.handler}: "
+                f"{stats.queries} queries, {stats.db_time * 1000:.1f} ms in DB"
+            )
@@ -0,0 +1,212 @@
+# src/services/browse_snapshot.py
+import asyncio
+import json
+import logging
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.database.models import PortfolioItem, Category
+from src.database.counters import get_counter, approved_key
+from src.database.queries import ProjectCard, fetch_approved_item
+from src.services.metrics import BROWSE_CARDS
+
+logger = logging.getLogger(__name__)
+
+# Снимок просмотра: упорядоченные id проектов категории для одного пользователя и их общее число
+IDS_KEY = "browse:{user_id}:{category_id}:ids"
+TOTAL_KEY = "browse:{user_id}:{category_id}:total"
+# Кэш полей одобренного проекта (общий для всех пользователей)
+ITEM_KEY = "browse:item:{item_id}"
+
+ITEM_FIELDS = (
+    "id", "title", "description", "photo_file_id", "document_file_id",
+    "link", "is_approved", "user_id", "category_id", "version",
+)
+
+# Сколько раз пропускать проекты, удаленные после создания снимка
+MAX_SKIPS = 5
+
+
+class BrowseSnapshots:
+    """
+    Снимки просмотра категорий в Redis.
+
+    При открытии категории упорядоченный список id (не больше size) сохраняется
+    на ttl секунд, и листание становится чтением соседних id из списка и проекта
+    по первичному ключу (тоже через кэш Redis). Позиции не сдвигаются, даже если
+    между нажатиями проекты добавляют или удаляют. За пределами снимка (или когда
+    он истек) хэндлер возвращается к seek-запросу fetch_project_card.
+
+    После показа карточки фоновая задача прогревает кэш следующих prefetch проектов.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        session_maker: async_sessionmaker[AsyncSession],
+        ttl: int = 600,
+        size: int = 2000,
+        prefetch: int = 3,
+        item_ttl: int = 300,
+    ):
+        self._redis = redis
+        self._session_maker = session_maker
+        self._ttl = ttl
+        self._size = size
+        self._prefetch = prefetch
+        self._item_ttl = item_ttl
+        self._prefetching: dict[tuple[int, int], asyncio.Task] = {}
+
+    async def open(self, session: AsyncSession, user_id: int, category_id: int):
+        """Сохраняет снимок категории для пользователя (по частичным индексам, только id)."""
+        stmt = select(PortfolioItem.id).where(PortfolioItem.is_approved)
+        if category_id != 0:
+            stmt = stmt.where(PortfolioItem.category_id == category_id)
+        ids = list(await session.scalars(stmt.order_by(PortfolioItem.id).limit(self._size)))
+        # Снимок может быть обрезан - тогда общее число берется из счетчиков
+        total = len(ids) if len(ids) < self._size else max(await get_counter(session, approved_key(category_id)), len(ids))
+
+        ids_key, total_key = self._keys(user_id, category_id)
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.delete(ids_key)
+                if ids:
+                    pipe.rpush(ids_key, *ids)
+                    pipe.expire(ids_key, self._ttl)
+                pipe.set(total_key, total, ex=self._ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить снимок просмотра: {e}")
+
+    async def fetch_card(self, session: AsyncSession, user_id: int, category_id: int, index: int, step: int = 1) -> tuple[ProjectCard, int] | None:
+        """
+        Карточка на позиции index снимка и ее итоговая позиция.
+        None - снимка нет (истек) или позиция за пределами сохраненной части: нужен seek-запрос.
+        """
+        ids_key, total_key = self._keys(user_id, category_id)
+        for _ in range(MAX_SKIPS):
+            try:
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    pipe.lrange(ids_key, max(index - 1, 0), index + 1)
+                    pipe.get(total_key)
+                    pipe.expire(ids_key, self._ttl)
+                    pipe.expire(total_key, self._ttl)
+                    window, total, _, _ = await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Снимок просмотра недоступен: {e}")
+                return None
+            if total is None or index < 0:
+                return None
+            total = int(total)
+
+            window = [int(item_id) for item_id in window]
+            offset = 0 if index == 0 else 1
+            if offset >= len(window):
+                if index >= total and total:
+                    # Конец списка - по кругу к первому проекту, как и seek-запрос
+                    index, step = 0, 1
+                    continue
+                return None
+
+            found = await self.get_item(session, window[offset])
+            if found is None:
+                # Проект удален после создания снимка - убираем его и смотрим следующий
+                await self._redis.lrem(ids_key, 1, window[offset])
+                await self._redis.decr(total_key)
+                if step < 0:
+                    index -= 1
+                continue
+
+            item, category_name = found
+            prev_id = window[offset - 1] if offset else None
+            next_id = window[offset + 1] if offset + 1 < len(window) else None
+            if next_id is None and index + 1 < total:
+                # Снимок обрезан: следующий проект есть, но его id ищется seek-запросом
+                next_id = item.id
+            self._schedule_prefetch(user_id, category_id, index, step)
+            return ProjectCard(
+                item=item, category_name=category_name, prev_id=prev_id, next_id=next_id,
+                total_count=total, wrapped=False
+            ), index
+        return None
+
+    async def get_item(self, session: AsyncSession, item_id: int) -> tuple[PortfolioItem, str] | None:
+        """Одобренный проект и название категории: из кэша Redis, при промахе - по первичному ключу."""
+        try:
+            cached = await self._redis.get(ITEM_KEY.format(item_id=item_id))
+        except Exception as e:
+            logger.warning(f"Кэш проектов недоступен: {e}")
+            cached = None
+        if cached is not None:
+            BROWSE_CARDS.labels("cache").inc()
+            fields = json.loads(cached)
+            return PortfolioItem(**fields["item"]), fields["category_name"]
+
+        BROWSE_CARDS.labels("db").inc()
+        found = await fetch_approved_item(session, item_id)
+        if found is not None:
+            await self._store_items([found])
+        return found
+
+    async def invalidate_item(self, item_id: int):
+        """Сбрасывает кэш полей проекта. Вызывать после изменения или удаления одобренного проекта."""
+        try:
+            await self._redis.delete(ITEM_KEY.format(item_id=item_id))
+        except Exception as e:
+            logger.warning(f"Не удалось сбросить кэш проекта {item_id}: {e}")
+
+    def _keys(self, user_id: int, category_id: int) -> tuple[str, str]:
+        return (
+            IDS_KEY.format(user_id=user_id, category_id=category_id),
+            TOTAL_KEY.format(user_id=user_id, category_id=category_id),
+        )
+
+    def _schedule_prefetch(self, user_id: int, category_id: int, index: int, step: int):
+        if not self._prefetch:
+            return
+        key = (user_id, category_id)
+        running = self._prefetching.get(key)
+        if running is not None and not running.done():
+            return
+        task = asyncio.create_task(self._prefetch_items(user_id, category_id, index, step))
+        self._prefetching[key] = task
+        task.add_done_callback(lambda _: self._prefetching.pop(key, None))
+
+    async def _prefetch_items(self, user_id: int, category_id: int, index: int, step: int):
+        """Прогревает кэш следующих проектов в направлении листания (один запрос к БД на все промахи)."""
+        ids_key, _ = self._keys(user_id, category_id)
+        start, end = (index + 1, index + self._prefetch) if step > 0 else (max(index - self._prefetch, 0), index - 1)
+        if end < start:
+            return
+        try:
+            ids = [int(item_id) for item_id in await self._redis.lrange(ids_key, start, end)]
+            if not ids:
+                return
+            cached = await self._redis.mget([ITEM_KEY.format(item_id=item_id) for item_id in ids])
+            missing = [item_id for item_id, value in zip(ids, cached) if value is None]
+            if not missing:
+                return
+            async with self._session_maker() as session:
+                result = await session.execute(
+                    select(PortfolioItem, Category.name)
+                    .join(Category, Category.id == PortfolioItem.category_id)
+                    .where(PortfolioItem.id.in_(missing), PortfolioItem.is_approved)
+                )
+                await self._store_items([tuple(row) for row in result])
+        except Exception as e:
+            logger.debug(f"Предзагрузка карточек не удалась: {e}")
+
+    async def _store_items(self, found: list[tuple[PortfolioItem, str]]):
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for item, category_name in found:
+                    payload = {
+                        "item": {field: getattr(item, field) for field in ITEM_FIELDS},
+                        "category_name": category_name,
+                    }
+                    pipe.set(ITEM_KEY.format(item_id=item.id), json.dumps(payload, ensure_ascii=False), ex=self._item_ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить кэш проектов: {e}")
@@ -0,0 +1,62 @@
+# src/services/card_cache.py
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable
+
+from aiogram.types import InlineKeyboardMarkup
+
+from src.services.metrics import CARD_RENDER_CACHE
+
+
+@dataclass(frozen=True, slots=True)
+class RenderedCard:
+    """Готовая к отправке карточка. Клавиатура общая для всех попаданий - не изменять."""
+    caption: str
+    reply_markup: InlineKeyboardMarkup
+    photo_file_id: str | None
+
+
+class CardRenderCache:
+    """
+    LRU-кэш отрисованных карточек проектов в памяти процесса.
+
+    Ключ начинается с (item_id, version, ...): изменение проекта увеличивает version,
+    и старые записи просто перестают находиться - в том числе в других процессах,
+    поэтому общий кэш и рассылка инвалидаций не нужны. Удаленный проект
+    дополнительно вычищается через invalidate_item, чтобы не занимать память.
+    """
+
+    def __init__(self, max_size: int = 5000):
+        self._max_size = max_size
+        self._cards: OrderedDict[tuple, RenderedCard] = OrderedDict()
+        self._keys_by_item: dict[int, set[tuple]] = {}
+
+    def get(self, key: tuple[Hashable, ...]) -> RenderedCard | None:
+        card = self._cards.get(key)
+        if card is None:
+            CARD_RENDER_CACHE.labels("miss").inc()
+            return None
+        self._cards.move_to_end(key)
+        CARD_RENDER_CACHE.labels("hit").inc()
+        return card
+
+    def put(self, key: tuple[Hashable, ...], card: RenderedCard) -> RenderedCard:
+        self._cards[key] = card
+        self._cards.move_to_end(key)
+        self._keys_by_item.setdefault(key[0], set()).add(key)
+        while len(self._cards) > self._max_size:
+            old_key, _ = self._cards.popitem(last=False)
+            self._forget(old_key)
+        return card
+
+    def invalidate_item(self, item_id: int):
+        """Удаляет все отрисовки проекта (любые версии, позиции и роли)."""
+        for key in self._keys_by_item.pop(item_id, ()):
+            self._cards.pop(key, None)
+
+    def _forget(self, key: tuple):
+        keys = self._keys_by_item.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_item[key[0]]
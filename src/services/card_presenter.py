@@ -0,0 +1,63 @@
+# src/services/card_presenter.py
+import logging
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, InputMediaPhoto
+
+from src.services.card_cache import RenderedCard
+from src.services.metrics import CARD_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+
+def _not_modified(error: TelegramBadRequest) -> bool:
+    return "message is not modified" in str(error)
+
+
+async def present_card(message: Message, card: RenderedCard, *, replace: bool = True, parse_mode: str = 'Markdown'):
+    """
+    Показывает карточку минимальным числом вызовов Bot API.
+
+    replace=False - карточка отправляется новым сообщением. Иначе сообщение с кнопкой
+    превращается в новую карточку:
+      текст -> текст: editMessageText;
+      фото -> фото:   editMessageMedia (фото, подпись и клавиатура одним вызовом);
+      фото -> текст, текст -> фото: тип сообщения в Telegram не меняется,
+      поэтому старое удаляется и отправляется новое.
+    Если редактирование невозможно (слишком старое сообщение и т.п.), старое сообщение
+    тоже удаляется и отправляется новое - в чате остается одна карточка.
+    """
+    if replace:
+        try:
+            if card.photo_file_id and message.photo:
+                CARD_TRANSITIONS.labels("edit_media").inc()
+                await message.edit_media(
+                    InputMediaPhoto(media=card.photo_file_id, caption=card.caption, parse_mode=parse_mode),
+                    reply_markup=card.reply_markup
+                )
+                return
+            if not card.photo_file_id and not message.photo:
+                CARD_TRANSITIONS.labels("edit_text").inc()
+                await message.edit_text(card.caption, reply_markup=card.reply_markup, parse_mode=parse_mode)
+                return
+            # Смена типа сообщения (фото <-> текст)
+            CARD_TRANSITIONS.labels("delete_send").inc()
+        except TelegramBadRequest as e:
+            if _not_modified(e):
+                # Повторное нажатие на ту же карточку
+                return
+            logger.debug(f"Не удалось отредактировать карточку, заменяем новой: {e}")
+            CARD_TRANSITIONS.labels("edit_failed").inc()
+        try:
+            await message.delete()
+        except Exception:
+            pass
+    else:
+        CARD_TRANSITIONS.labels("send").inc()
+
+    if card.photo_file_id:
+        await message.answer_photo(
+            photo=card.photo_file_id, caption=card.caption, reply_markup=card.reply_markup, parse_mode=parse_mode
+        )
+    else:
+        await message.answer(card.caption, reply_markup=card.reply_markup, parse_mode=parse_mode)
@@ -0,0 +1,123 @@
+# src/services/category_cache.py
+import json
+import logging
+import time
+
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.callbacks.project_cb import CategoryCallback
+from src.database.models import Category
+
+logger = logging.getLogger(__name__)
+
+# Ключ общей (между репликами) копии списка категорий в Redis
+REDIS_KEY = "cache:categories"
+
+
+def build_categories_keyboard(categories: list[tuple[int, str]]) -> InlineKeyboardMarkup:
+    """Собирает клавиатуру выбора категории из списка (id, name)."""
+    buttons = []
+
+    # "All Categories" button
+    buttons.append([InlineKeyboardButton(
+        text="⭐️ ALL PROJECTS",
+        callback_data=CategoryCallback(category_id=0).pack()
+    )])
+
+    # Category buttons
+    row = []
+    for category_id, name in categories:
+        row.append(InlineKeyboardButton(
+            text=name,
+            callback_data=CategoryCallback(category_id=category_id).pack()
+        ))
+        if len(row) == 2:
+            buttons.append(row)
+            row = []
+    if row:
+        buttons.append(row)
+
+    buttons.append([InlineKeyboardButton(text="🔙 Back to Main Menu", callback_data="show_start")])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+class CategoryCache:
+    """
+    Кэш категорий: локальная копия в процессе (список, имена и готовая клавиатура)
+    и общая копия в Redis. Порядок чтения: процесс -> Redis -> PostgreSQL.
+
+    Локальная копия живет не дольше local_ttl секунд, чтобы изменения,
+    сделанные другой репликой, подхватывались без перезапуска.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        session_maker: async_sessionmaker[AsyncSession],
+        local_ttl: float = 60.0,
+        redis_ttl: int = 24 * 60 * 60,
+    ):
+        self._redis = redis
+        self._session_maker = session_maker
+        self._local_ttl = local_ttl
+        self._redis_ttl = redis_ttl
+
+        self._categories: list[tuple[int, str]] | None = None
+        self._names: dict[int, str] = {}
+        self._keyboard: InlineKeyboardMarkup | None = None
+        self._loaded_at = 0.0
+
+    async def get_categories(self) -> list[tuple[int, str]]:
+        """Возвращает список (id, name), отсортированный по имени."""
+        if self._categories is None or time.monotonic() - self._loaded_at > self._local_ttl:
+            self._store_locally(await self._load())
+        return self._categories
+
+    async def get_keyboard(self) -> InlineKeyboardMarkup:
+        """Возвращает готовую клавиатуру выбора категории."""
+        await self.get_categories()
+        return self._keyboard
+
+    async def get_name(self, category_id: int) -> str | None:
+        """Возвращает название категории по ID (None, если категории нет)."""
+        await self.get_categories()
+        return self._names.get(category_id)
+
+    async def invalidate(self):
+        """Сбрасывает обе копии. Вызывать после добавления/изменения категорий."""
+        self._categories = None
+        self._names = {}
+        self._keyboard = None
+        try:
+            await self._redis.delete(REDIS_KEY)
+        except Exception as e:
+            logger.warning(f"Не удалось сбросить кэш категорий в Redis: {e}")
+
+    def _store_locally(self, categories: list[tuple[int, str]]):
+        self._categories = categories
+        self._names = dict(categories)
+        self._keyboard = build_categories_keyboard(categories)
+        self._loaded_at = time.monotonic()
+
+    async def _load(self) -> list[tuple[int, str]]:
+        try:
+            cached = await self._redis.get(REDIS_KEY)
+        except Exception as e:
+            logger.warning(f"Redis недоступен для кэша категорий: {e}")
+            cached = None
+
+        if cached:
+            return [(int(category_id), name) for category_id, name in json.loads(cached)]
+
+        async with self._session_maker() as session:
+            result = await session.execute(select(Category.id, Category.name).order_by(Category.name))
+            categories = [(row.id, row.name) for row in result]
+
+        try:
+            await self._redis.set(REDIS_KEY, json.dumps(categories), ex=self._redis_ttl)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить кэш категорий в Redis: {e}")
+        return categories
@@ -0,0 +1,131 @@
+# src/services/fsm_storage.py
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+import orjson
+from aiogram.fsm.storage.base import BaseEventIsolation, DefaultKeyBuilder, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage, RedisEventIsolation
+from redis.asyncio import Redis
+
+from src.config import settings
+from src.services.metrics import FSM_KEYS, FSM_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Префикс ключей FSM: fsm:<chat_id>:<user_id>:state|data|lock (DefaultKeyBuilder без with_bot_id)
+FSM_PREFIX = "fsm"
+# Сколько ключей SCAN возвращает за один шаг при подсчете статистики
+SCAN_BATCH = 1000
+
+
+def _dumps(data) -> bytes:
+    # orjson компактнее и быстрее json: без пробелов, сразу в bytes
+    return orjson.dumps(data)
+
+
+def create_fsm_storage(redis: Redis) -> RedisStorage:
+    """
+    Хранилище FSM в Redis: компактная сериализация (orjson) и TTL для состояния и данных,
+    чтобы брошенные на полпути сценарии (например, добавление проекта) не копились вечно.
+    TTL обновляется при каждой записи, так что активный пользователь его не замечает.
+    """
+    return RedisStorage(
+        redis=redis,
+        key_builder=DefaultKeyBuilder(prefix=FSM_PREFIX),
+        state_ttl=settings.FSM_STATE_TTL or None,
+        data_ttl=settings.FSM_DATA_TTL or None,
+        json_loads=orjson.loads,
+        json_dumps=_dumps,
+    )
+
+
+class OrderedEventIsolation(BaseEventIsolation):
+    """
+    Изоляция апдейтов чата: FIFO-замок asyncio в процессе перед замком Redis.
+
+    Замок Redis (redis-py Lock) дает взаимное исключение между процессами, но ожидающие
+    опрашивают его каждые 0.1 с и получают его в случайном порядке. Локальный asyncio.Lock
+    выстраивает апдейты одного чата в процессе в порядке поступления, и замок Redis
+    ждет не больше одного апдейта чата на процесс.
+    """
+
+    def __init__(self, redis_isolation: RedisEventIsolation):
+        self._redis_isolation = redis_isolation
+        self._locks: dict[StorageKey, asyncio.Lock] = {}
+        self._waiters: dict[StorageKey, int] = {}
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        local = self._locks.get(key)
+        if local is None:
+            local = self._locks[key] = asyncio.Lock()
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            async with local:
+                async with self._redis_isolation.lock(key):
+                    yield
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                # Этот чат больше никто не ждет - замок не нужен
+                del self._waiters[key]
+                del self._locks[key]
+
+    async def close(self) -> None:
+        await self._redis_isolation.close()
+
+
+def create_event_isolation(redis: Redis) -> OrderedEventIsolation:
+    """
+    Замок на чат/пользователя (ключ Redis fsm:<chat_id>:<user_id>:lock).
+    FSMContextMiddleware берет его ДО чтения состояния, поэтому следующий апдейт чата
+    видит состояние, уже записанное предыдущим; замок Redis общий для всех процессов
+    (webhook с несколькими воркерами). timeout - страховка от замка упавшего процесса.
+    """
+    return OrderedEventIsolation(RedisEventIsolation(
+        redis=redis,
+        key_builder=DefaultKeyBuilder(prefix=FSM_PREFIX),
+        lock_kwargs={"timeout": settings.FSM_LOCK_TIMEOUT},
+    ))
+
+
+async def collect_fsm_stats(redis: Redis) -> dict[str, tuple[int, int]]:
+    """Считает ключи FSM и их размер в байтах: {'state'|'data': (keys, bytes)}. SCAN не блокирует Redis."""
+    stats = {"state": [0, 0], "data": [0, 0]}
+    async for keys in _scan_batches(redis, f"{FSM_PREFIX}:*"):
+        async with redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.strlen(key)
+            sizes = await pipe.execute()
+        for key, size in zip(keys, sizes):
+            part = (key.decode() if isinstance(key, bytes) else key).rsplit(":", 1)[-1]
+            if part in stats:
+                stats[part][0] += 1
+                stats[part][1] += size
+    return {part: (keys, size) for part, (keys, size) in stats.items()}
+
+
+async def run_fsm_stats(redis: Redis, interval: float):
+    """Фоновая задача: периодически обновляет метрики размера FSM."""
+    while True:
+        try:
+            for part, (keys, size) in (await collect_fsm_stats(redis)).items():
+                FSM_KEYS.labels(part).set(keys)
+                FSM_BYTES.labels(part).set(size)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка подсчета ключей FSM: {e}", exc_info=True)
+        await asyncio.sleep(interval)
+
+
+async def _scan_batches(redis: Redis, pattern: str):
+    cursor = 0
+    while True:
+        cursor, keys = await redis.scan(cursor=cursor, match=pattern, count=SCAN_BATCH)
+        if keys:
+            yield keys
+        if not cursor:
+            break
@@ -0,0 +1,204 @@
+# src/services/inline_results.py
+import asyncio
+import json
+import logging
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.database.models import PortfolioItem, Category
+from src.database.queries import search_project_ids
+from src.services.category_cache import CategoryCache
+from src.services.metrics import INLINE_QUERIES
+
+logger = logging.getLogger(__name__)
+
+# Ключи наборов результатов: по категории (0 - все проекты) и по нормализованному запросу
+# (v2: в элементе набора есть поле body)
+CATEGORY_KEY = "inline:v2:cat:{category_id}"
+QUERY_KEY = "inline:v2:q:{query}"
+# Популярность свободных запросов (sorted set: запрос -> число обращений)
+POPULAR_KEY = "inline:popular"
+
+MAX_QUERY_LENGTH = 64
+# Более короткие запросы (первые буквы при наборе) не учитываются в популярности
+MIN_TRACKED_QUERY_LENGTH = 3
+# Сколько ключей SCAN возвращает за один шаг при сбросе наборов по запросам
+SCAN_BATCH = 500
+# Описание в списке результатов - одна строка
+DESCRIPTION_LENGTH = 100
+# Описание в отправляемом сообщении: подпись к фото в Telegram - не больше 1024 символов
+BODY_LENGTH = 800
+
+
+def normalize_query(query: str) -> str:
+    """Приводит запрос к виду ключа кэша: нижний регистр, одиночные пробелы, ограничение длины."""
+    return " ".join(query.lower().split())[:MAX_QUERY_LENGTH]
+
+
+class InlineResultsCache:
+    """
+    Готовые наборы результатов inline-режима в Redis.
+
+    Пустой запрос и запрос, совпадающий с названием категории, обслуживаются наборами
+    по категориям, остальные - наборами по запросу. Наборы категорий и самых популярных
+    запросов заранее пересчитывает фоновая задача (precompute); редкий запрос считается
+    при первом обращении и тоже кэшируется, так что PostgreSQL почти не видит нажатий клавиш.
+
+    Элемент набора - словарь с полями проекта, нужными для InlineQueryResult
+    (description - короткое описание для списка, body - текст для сообщения).
+    После одобрения, отклонения или удаления проекта хэндлеры вызывают invalidate.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        session_maker: async_sessionmaker[AsyncSession],
+        category_cache: CategoryCache,
+        set_size: int = 50,
+        ttl: int = 15 * 60,
+        popular_limit: int = 100,
+    ):
+        self._redis = redis
+        self._session_maker = session_maker
+        self._category_cache = category_cache
+        self._set_size = set_size
+        self._ttl = ttl
+        self._popular_limit = popular_limit
+
+    async def get_results(self, query: str) -> list[dict]:
+        """Набор результатов для inline-запроса: из Redis, а при промахе - из БД с записью в Redis."""
+        query = normalize_query(query)
+        category_id = await self._match_category(query)
+        if category_id is not None:
+            key = CATEGORY_KEY.format(category_id=category_id)
+        else:
+            key = QUERY_KEY.format(query=query)
+
+        try:
+            cached = await self._redis.get(key)
+        except Exception as e:
+            logger.warning(f"Redis недоступен для inline-кэша: {e}")
+            cached = None
+        if cached is not None:
+            INLINE_QUERIES.labels("cache").inc()
+            return json.loads(cached)
+
+        INLINE_QUERIES.labels("db").inc()
+        if category_id is None:
+            # Популярность считаем по промахам: попадания в кэш (в т.ч. в пересчитанные наборы) не пишут в Redis
+            await self._track(query)
+        async with self._session_maker() as session:
+            if category_id is not None:
+                results = await self._load_category(session, category_id)
+            else:
+                results = await self._load_query(session, query)
+        await self._store(key, results)
+        return results
+
+    async def invalidate(self, category_id: int, removed: bool = False):
+        """
+        Сбрасывает наборы категории и "всех проектов" - их пересчитает следующий запрос.
+        removed=True (одобренный проект удален): сбрасываются и наборы по запросам,
+        иначе удаленный проект показывался бы в них до истечения TTL.
+        """
+        try:
+            await self._redis.delete(CATEGORY_KEY.format(category_id=category_id), CATEGORY_KEY.format(category_id=0))
+            if removed:
+                async for key in self._redis.scan_iter(match=QUERY_KEY.format(query="*"), count=SCAN_BATCH):
+                    await self._redis.unlink(key)
+        except Exception as e:
+            logger.warning(f"Не удалось сбросить inline-наборы: {e}")
+
+    async def precompute(self):
+        """Пересчитывает наборы всех категорий и самых популярных запросов."""
+        categories = await self._category_cache.get_categories()
+        try:
+            popular = await self._redis.zrevrange(POPULAR_KEY, 0, self._popular_limit - 1)
+            # Хвост редких запросов не копим бесконечно
+            await self._redis.zremrangebyrank(POPULAR_KEY, 0, -self._popular_limit * 10 - 1)
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать популярные inline-запросы: {e}")
+            popular = []
+
+        async with self._session_maker() as session:
+            for category_id in [0, *(category_id for category_id, _ in categories)]:
+                await self._store(CATEGORY_KEY.format(category_id=category_id), await self._load_category(session, category_id))
+            for raw_query in popular:
+                query = raw_query.decode() if isinstance(raw_query, bytes) else raw_query
+                await self._store(QUERY_KEY.format(query=query), await self._load_query(session, query))
+        logger.debug(f"Inline-наборы пересчитаны: {len(categories) + 1} категорий, {len(popular)} запросов.")
+
+    async def run_precompute(self, interval: float):
+        """Фоновая задача: периодический пересчет наборов (интервал меньше TTL, чтобы горячие ключи не истекали)."""
+        while True:
+            try:
+                await self.precompute()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка пересчета inline-наборов: {e}", exc_info=True)
+            await asyncio.sleep(interval)
+
+    async def _match_category(self, query: str) -> int | None:
+        if not query:
+            return 0
+        for category_id, name in await self._category_cache.get_categories():
+            if name.lower() == query:
+                return category_id
+        return None
+
+    async def _track(self, query: str):
+        if len(query) < MIN_TRACKED_QUERY_LENGTH:
+            return
+        try:
+            await self._redis.zincrby(POPULAR_KEY, 1, query)
+        except Exception as e:
+            logger.warning(f"Не удалось учесть inline-запрос: {e}")
+
+    async def _store(self, key: str, results: list[dict]):
+        try:
+            await self._redis.set(key, json.dumps(results, ensure_ascii=False), ex=self._ttl)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить inline-набор в Redis: {e}")
+
+    def _columns(self):
+        return select(
+            PortfolioItem.id, PortfolioItem.title, PortfolioItem.description,
+            PortfolioItem.photo_file_id, PortfolioItem.link, Category.name.label("category"),
+        ).join(Category, Category.id == PortfolioItem.category_id)
+
+    async def _load_category(self, session: AsyncSession, category_id: int) -> list[dict]:
+        # Самые новые одобренные проекты (частичные индексы по id среди одобренных)
+        stmt = self._columns().where(PortfolioItem.is_approved)
+        if category_id != 0:
+            stmt = stmt.where(PortfolioItem.category_id == category_id)
+        stmt = stmt.order_by(PortfolioItem.id.desc()).limit(self._set_size)
+        return [self._to_result(row) for row in await session.execute(stmt)]
+
+    async def _load_query(self, session: AsyncSession, query: str) -> list[dict]:
+        ids = await search_project_ids(session, query, limit=self._set_size)
+        if not ids:
+            return []
+        rows = {row.id: row for row in await session.execute(
+            self._columns().where(PortfolioItem.id.in_(ids), PortfolioItem.is_approved)
+        )}
+        # Порядок релевантности из поиска
+        return [self._to_result(rows[item_id]) for item_id in ids if item_id in rows]
+
+    @staticmethod
+    def _to_result(row) -> dict:
+        return {
+            "id": row.id,
+            "title": row.title,
+            "description": _shorten(row.description, DESCRIPTION_LENGTH),
+            "body": _shorten(row.description, BODY_LENGTH),
+            "photo_file_id": row.photo_file_id,
+            "link": row.link,
+            "category": row.category,
+        }
+
+
+def _shorten(text: str, length: int) -> str:
+    return text if len(text) <= length else text[:length - 1] + "…"
@@ -0,0 +1,138 @@
+# src/services/metrics.py
+"""Метрики Prometheus бота (отдаются на /metrics, см. src/web/metrics.py)."""
+from prometheus_client import Counter, Gauge, Histogram
+
+# Границы бакетов: от 5 мс до 10 с - типичный разброс для хэндлеров и запросов к Bot API
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# --- Хэндлеры ---
+HANDLER_LATENCY = Histogram(
+    "bot_handler_latency_seconds", "Время выполнения хэндлера",
+    ["handler", "action"], buckets=LATENCY_BUCKETS,
+)
+HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total", "Необработанные исключения в хэндлерах",
+    ["handler", "action", "error"],
+)
+HANDLER_IN_FLIGHT = Gauge(
+    "bot_handler_in_flight", "Хэндлеры, выполняющиеся прямо сейчас",
+    ["handler"], multiprocess_mode="livesum",
+)
+
+# --- Bot API ---
+TELEGRAM_API_LATENCY = Histogram(
+    "bot_telegram_api_latency_seconds", "Время запроса к Telegram Bot API",
+    ["method"], buckets=LATENCY_BUCKETS,
+)
+TELEGRAM_API_ERRORS = Counter(
+    "bot_telegram_api_errors_total", "Ошибки запросов к Telegram Bot API",
+    ["method", "error"],
+)
+
+# --- База данных (src/database/instrumentation.py) ---
+DB_QUERY_LATENCY = Histogram(
+    "bot_db_query_latency_seconds", "Время выполнения одного SQL-запроса",
+    buckets=LATENCY_BUCKETS,
+)
+DB_SLOW_QUERIES = Counter(
+    "bot_db_slow_queries_total", "SQL-запросы дольше SLOW_QUERY_THRESHOLD_MS",
+    ["handler"],
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "bot_db_pool_checkout_wait_seconds", "Ожидание свободного соединения в пуле",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "bot_db_pool_checked_out", "Занятые соединения пула",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "bot_db_pool_connections", "Открытые соединения пула (свободные и занятые)",
+    multiprocess_mode="livesum",
+)
+DB_POOL_SATURATION = Gauge(
+    "bot_db_pool_saturation", "Доля занятых соединений от pool_size + max_overflow",
+    multiprocess_mode="livemax",
+)
+DB_QUERIES_PER_UPDATE = Histogram(
+    "bot_db_queries_per_update", "Количество SQL-запросов на один апдейт",
+    ["handler"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50),
+)
+DB_TIME_PER_UPDATE = Histogram(
+    "bot_db_time_per_update_seconds", "Суммарное время в БД на один апдейт",
+    ["handler"], buckets=LATENCY_BUCKETS,
+)
+
+# --- Очередь апдейтов (ConcurrencyLimitMiddleware) ---
+UPDATES_WAITING = Gauge(
+    "bot_updates_waiting", "Апдейты, ожидающие обработки (очередь чата или свободный слот)",
+    multiprocess_mode="livesum",
+)
+UPDATES_IN_PROGRESS = Gauge(
+    "bot_updates_in_progress", "Апдейты, обрабатываемые прямо сейчас",
+    multiprocess_mode="livesum",
+)
+UPDATE_WAIT = Histogram(
+    "bot_update_wait_seconds", "Время ожидания апдейта в очереди до начала обработки",
+    buckets=LATENCY_BUCKETS,
+)
+
+# --- Inline-режим (src/services/inline_results.py) ---
+INLINE_QUERIES = Counter(
+    "bot_inline_queries_total", "Inline-запросы по источнику набора результатов (cache/db)",
+    ["source"],
+)
+
+# --- Кэш отрисованных карточек (src/services/card_cache.py) ---
+CARD_RENDER_CACHE = Counter(
+    "bot_card_render_cache_total", "Обращения к кэшу отрисованных карточек (hit/miss)",
+    ["result"],
+)
+CARD_TRANSITIONS = Counter(
+    "bot_card_transitions_total", "Способ показа карточки (edit_text/edit_media/delete_send/edit_failed/send)",
+    ["operation"],
+)
+
+# --- Снимки просмотра (src/services/browse_snapshot.py) ---
+BROWSE_CARDS = Counter(
+    "bot_browse_cards_total", "Источник карточки при листании (cache/db - снимок, seek - запрос по курсору)",
+    ["source"],
+)
+
+# --- FSM в Redis (src/services/fsm_storage.py) ---
+FSM_KEYS = Gauge(
+    "bot_fsm_keys", "Ключи FSM в Redis (state/data)",
+    ["part"], multiprocess_mode="max",
+)
+FSM_BYTES = Gauge(
+    "bot_fsm_bytes", "Размер значений FSM в Redis, байты (state/data)",
+    ["part"], multiprocess_mode="max",
+)
+
+# --- Пул соединений Redis (src/services/redis_pool.py) ---
+REDIS_POOL_WAIT = Histogram(
+    "bot_redis_pool_wait_seconds", "Ожидание свободного соединения в пуле Redis",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+REDIS_POOL_IN_USE = Gauge(
+    "bot_redis_pool_in_use", "Занятые соединения пула Redis",
+    multiprocess_mode="livesum",
+)
+REDIS_POOL_SATURATION = Gauge(
+    "bot_redis_pool_saturation", "Доля занятых соединений от REDIS_MAX_CONNECTIONS",
+    multiprocess_mode="livemax",
+)
+
+# --- Очередь модерации (src/database/moderation.py) ---
+MODERATION_QUEUE_DEPTH = Gauge(
+    "bot_moderation_queue_depth", "Проекты, ожидающие модерации",
+    multiprocess_mode="max",
+)
+MODERATION_QUEUE_AGE = Gauge(
+    "bot_moderation_queue_oldest_age_seconds", "Сколько ждет старейший проект на модерации, секунды",
+    multiprocess_mode="max",
+)
+MODERATION_QUEUE_LEASED = Gauge(
+    "bot_moderation_queue_leased", "Проекты на модерации, закрепленные сейчас за модераторами",
+    multiprocess_mode="max",
+)
@@ -0,0 +1,184 @@
+# src/services/notifier.py
+import asyncio
+import json
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+# Очередь уведомлений в Redis: новые попадают в QUEUE_KEY, отправляемые - в PROCESSING_KEY.
+# Если процесс упал во время отправки, при следующем запуске они возвращаются в очередь.
+QUEUE_KEY = "notify:queue"
+PROCESSING_KEY = "notify:processing"
+
+
+class TokenBucket:
+    """Token bucket: не больше rate событий в секунду, всплеск до capacity."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0  # Пауза после 429 Too Many Requests
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        while True:
+            pause = self.blocked_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity and self.blocked_until <= time.monotonic()
+
+
+class NotificationQueue:
+    """
+    Исходящая очередь уведомлений пользователям.
+
+    enqueue() можно вызывать из любого процесса - это один LPUSH в Redis.
+    Отправляет сообщения один процесс (лидер): с общим и per-chat лимитом,
+    с учетом retry_after из ответа 429 и повторами при сетевых ошибках.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        global_rate: float = 25.0,
+        per_chat_rate: float = 1.0,
+        max_attempts: int = 5,
+        concurrency: int = 10,
+    ):
+        self._redis = redis
+        self._global_bucket = TokenBucket(global_rate)
+        self._per_chat_rate = per_chat_rate
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        self._max_attempts = max_attempts
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._task: asyncio.Task | None = None
+        self._in_flight: set[asyncio.Task] = set()
+
+    # --- Постановка в очередь ---
+
+    async def enqueue(self, chat_id: int, text: str, parse_mode: str | None = None):
+        """Ставит уведомление в очередь и сразу возвращает управление."""
+        await self.enqueue_many([(chat_id, text)], parse_mode=parse_mode)
+
+    async def enqueue_many(self, messages: list[tuple[int, str]], parse_mode: str | None = None):
+        """Ставит пачку уведомлений в очередь одной командой Redis."""
+        if not messages:
+            return
+        payloads = [
+            json.dumps({"chat_id": chat_id, "text": text, "parse_mode": parse_mode, "attempt": 0})
+            for chat_id, text in messages
+        ]
+        await self._redis.lpush(QUEUE_KEY, *payloads)
+
+    async def depth(self) -> int:
+        return await self._redis.llen(QUEUE_KEY)
+
+    # --- Отправка ---
+
+    async def start(self, bot: Bot):
+        """Возвращает в очередь недоотправленное и запускает отправку."""
+        restored = 0
+        while await self._redis.lmove(PROCESSING_KEY, QUEUE_KEY, "RIGHT", "RIGHT"):
+            restored += 1
+        if restored:
+            logger.info(f"Восстановлено неотправленных уведомлений: {restored}")
+        self._task = asyncio.create_task(self._run(bot))
+
+    async def stop(self):
+        """Останавливает отправку. Недоотправленные сообщения остаются в Redis."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._in_flight):
+            task.cancel()
+
+    async def _run(self, bot: Bot):
+        while True:
+            try:
+                await self._semaphore.acquire()
+                raw = await self._redis.blmove(QUEUE_KEY, PROCESSING_KEY, 5, "RIGHT", "LEFT")
+                if raw is None or len(self._chat_buckets) > 10_000:
+                    self._cleanup_chat_buckets()
+                if raw is None:
+                    self._semaphore.release()
+                    continue
+                task = asyncio.create_task(self._deliver(bot, raw))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._semaphore.release()
+                logger.error(f"Ошибка чтения очереди уведомлений: {e}", exc_info=True)
+                await asyncio.sleep(1)
+
+    async def _deliver(self, bot: Bot, raw: bytes | str):
+        try:
+            try:
+                message = json.loads(raw)
+                chat_id = message["chat_id"]
+            except (ValueError, KeyError):
+                logger.error(f"Некорректное уведомление в очереди отброшено: {raw!r}")
+                await self._redis.lrem(PROCESSING_KEY, 1, raw)
+                return
+
+            while True:
+                bucket = self._chat_buckets.get(chat_id)
+                if bucket is None:
+                    bucket = self._chat_buckets[chat_id] = TokenBucket(self._per_chat_rate)
+                await bucket.acquire()
+                await self._global_bucket.acquire()
+                try:
+                    await bot.send_message(chat_id=chat_id, text=message["text"], parse_mode=message["parse_mode"])
+                    break
+                except TelegramRetryAfter as e:
+                    # 429: Telegram сам говорит, сколько ждать - приостанавливаем всю отправку
+                    logger.warning(f"Flood limit, повтор через {e.retry_after} с (chat {chat_id})")
+                    self._global_bucket.block(e.retry_after)
+                except (TelegramForbiddenError, TelegramBadRequest) as e:
+                    # Пользователь заблокировал бота / чат не существует - повторять бессмысленно
+                    logger.info(f"Уведомление для {chat_id} не доставлено: {e}")
+                    break
+                except Exception as e:
+                    message["attempt"] += 1
+                    if message["attempt"] >= self._max_attempts:
+                        logger.error(f"Уведомление для {chat_id} отброшено после {message['attempt']} попыток: {e}")
+                        break
+                    logger.warning(f"Ошибка отправки уведомления {chat_id} (попытка {message['attempt']}): {e}")
+                    await asyncio.sleep(min(2 ** message["attempt"], 60))
+            await self._redis.lrem(PROCESSING_KEY, 1, raw)
+        finally:
+            self._semaphore.release()
+
+    def _cleanup_chat_buckets(self):
+        # Полные бакеты ничего не ограничивают - не держим их в памяти
+        for chat_id in [chat_id for chat_id, bucket in self._chat_buckets.items() if bucket.idle]:
+            del self._chat_buckets[chat_id]
@@ -0,0 +1,74 @@
+# src/services/redis_pool.py
+import time
+
+from redis.asyncio import Redis, BlockingConnectionPool
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
+
+from src.config import settings
+from src.services.metrics import REDIS_POOL_WAIT, REDIS_POOL_IN_USE, REDIS_POOL_SATURATION
+
+
+class InstrumentedBlockingConnectionPool(BlockingConnectionPool):
+    """
+    Пул соединений Redis, который измеряет время ожидания свободного соединения
+    и сам считает занятые соединения (как пул БД в src/database/instrumentation.py).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_in_use = 0
+
+    async def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        finally:
+            REDIS_POOL_WAIT.observe(time.perf_counter() - started)
+        self._track_in_use(1)
+        return connection
+
+    async def release(self, connection):
+        try:
+            await super().release(connection)
+        finally:
+            self._track_in_use(-1)
+
+    def _track_in_use(self, delta: int):
+        self._metrics_in_use += delta
+        REDIS_POOL_IN_USE.inc(delta)
+        REDIS_POOL_SATURATION.set(self._metrics_in_use / self.max_connections)
+
+
+def create_redis_pool() -> InstrumentedBlockingConnectionPool:
+    """
+    Пул соединений Redis из настроек. Пул блокирующий: при исчерпании команды ждут
+    свободное соединение не дольше REDIS_POOL_TIMEOUT, а не открывают новые без ограничения.
+    Таймауты сокета и повторы с экспоненциальной задержкой не дают сбою Redis
+    надолго подвесить обработку апдейтов.
+    """
+    pool = InstrumentedBlockingConnectionPool(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        password=settings.REDIS_PASSWORD.get_secret_value() if settings.REDIS_PASSWORD else None,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+        socket_keepalive=True,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        retry=Retry(ExponentialBackoff(cap=1.0, base=0.05), settings.REDIS_RETRY_ATTEMPTS),
+        retry_on_error=[ConnectionError, TimeoutError],
+    )
+    return pool
+
+
+def create_redis() -> Redis:
+    """
+    Единственный клиент Redis процесса. Его пул общий для FSM, кэшей, снимков
+    просмотра и очереди уведомлений - создавайте один клиент на процесс.
+    """
+    return Redis(connection_pool=create_redis_pool())
+
@@ -0,0 +1,73 @@
+# src/services/role_cache.py
+import asyncio
+import logging
+
+from redis.asyncio import Redis
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import settings
+from src.database.models import User
+
+logger = logging.getLogger(__name__)
+
+# Канал Redis, в который публикуется факт изменения ролей
+ROLES_CHANNEL = "roles:changed"
+
+
+class RoleCache:
+    """
+    Множество администраторов/модераторов в памяти процесса.
+
+    Загружается из users.is_admin (плюс ADMIN_ID из настроек - владелец бота всегда
+    администратор), поэтому проверка роли на каждом апдейте не обращается к БД.
+    Изменение ролей публикуется в Redis pub/sub, и все процессы перечитывают
+    множество; на случай потерянного сообщения оно перечитывается и раз в refresh_interval.
+    """
+
+    def __init__(self, redis: Redis, session_maker: async_sessionmaker[AsyncSession], refresh_interval: float = 300.0):
+        self._redis = redis
+        self._session_maker = session_maker
+        self._refresh_interval = refresh_interval
+        self._admins: frozenset[int] = frozenset({settings.ADMIN_ID})
+
+    def is_admin(self, user_id: int) -> bool:
+        return user_id in self._admins
+
+    async def load(self):
+        """Перечитывает множество администраторов из БД."""
+        async with self._session_maker() as session:
+            admin_ids = await session.scalars(select(User.user_id).where(User.is_admin))
+            self._admins = frozenset({settings.ADMIN_ID, *admin_ids})
+        logger.debug(f"Роли загружены: {len(self._admins)} администраторов.")
+
+    async def set_role(self, session: AsyncSession, user_id: int, is_admin: bool) -> bool:
+        """Меняет роль пользователя в текущей транзакции. False - пользователя нет в БД."""
+        result = await session.execute(
+            update(User).where(User.user_id == user_id).values(is_admin=is_admin).returning(User.id)
+        )
+        return result.first() is not None
+
+    async def notify_changed(self):
+        """Вызывать после коммита изменения ролей: обновляет этот процесс и оповещает остальные."""
+        await self.load()
+        try:
+            await self._redis.publish(ROLES_CHANNEL, "1")
+        except Exception as e:
+            logger.warning(f"Не удалось оповестить процессы об изменении ролей: {e}")
+
+    async def listen(self):
+        """Фоновая задача: перечитывает роли по сообщению в канале или по таймауту refresh_interval."""
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(ROLES_CHANNEL)
+                    while True:
+                        # Изменения, пропущенные до подписки, тоже подхватываются этим перечитыванием
+                        await self.load()
+                        await pubsub.get_message(ignore_subscribe_messages=True, timeout=self._refresh_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка подписки на изменения ролей: {e}", exc_info=True)
+                await asyncio.sleep(5)
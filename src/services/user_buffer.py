@@ -0,0 +1,147 @@
+# src/services/user_buffer.py
+import asyncio
+import logging
+
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import settings
+from src.database.counters import bump_counters, USERS
+from src.database.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class UserRegistrationBuffer:
+    """
+    Write-behind буфер регистрации пользователей для /start.
+
+    Хэндлер только кладет (user_id, username) в память и сразу отвечает пользователю.
+    Буфер сбрасывается в БД каждые flush_interval секунд или при накоплении max_batch
+    записей одним INSERT ... ON CONFLICT (user_id) DO UPDATE.
+    Пачка, которую не удалось записать, возвращается в буфер; пользователь,
+    не записанный max_retries раз подряд, отбрасывается (с записью в лог).
+    """
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        flush_interval: float = 0.5,
+        max_batch: int = 500,
+        max_retries: int = 5,
+    ):
+        self._session_maker = session_maker
+        self._flush_interval = flush_interval
+        self._max_batch = max_batch
+        self._max_retries = max_retries
+
+        # user_id -> username (повторные /start одного пользователя схлопываются)
+        self._pending: dict[int, str | None] = {}
+        # user_id -> число неудачных попыток записи подряд
+        self._failures: dict[int, int] = {}
+        self._batch_full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def add(self, user_id: int, username: str | None):
+        """Добавляет пользователя в буфер (без ожидания БД)."""
+        self._pending[user_id] = username
+        if len(self._pending) >= self._max_batch:
+            self._batch_full.set()
+
+    def start(self):
+        """Запускает фоновый сброс буфера."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает фоновую задачу и сбрасывает остаток буфера."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_full.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Ошибка сброса буфера пользователей: {e}", exc_info=True)
+
+    async def flush(self):
+        """
+        Записывает накопленных пользователей пачками по max_batch (одна транзакция на пачку:
+        после всплеска или простоя БД буфер может превысить лимит параметров запроса asyncpg).
+
+        Когда вызов вернулся, в БД записаны все пользователи, добавленные до него, - в том
+        числе из пачки, которую в этот момент писал фоновый сброс (ожидание на _flush_lock).
+        Поэтому хэндлеры вызывают flush() перед вставкой строк, ссылающихся на users.
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, self._pending = list(self._pending.items()), {}
+            chunks = [dict(pending[i:i + self._max_batch]) for i in range(0, len(pending), self._max_batch)]
+
+            inserted = 0
+            for number, batch in enumerate(chunks):
+                try:
+                    inserted += await self._write(batch)
+                except Exception:
+                    self._requeue(batch)
+                    # Непопробованные пачки возвращаются без учета неудачи
+                    for rest in chunks[number + 1:]:
+                        for user_id, username in rest.items():
+                            self._pending.setdefault(user_id, username)
+                    raise
+                for user_id in batch:
+                    self._failures.pop(user_id, None)
+
+        if inserted:
+            logger.info(f"Зарегистрировано новых пользователей: {inserted} (в буфере было {len(pending)})")
+
+    async def _write(self, batch: dict[int, str | None]) -> int:
+        """Одна пачка: INSERT ... ON CONFLICT и счетчик в одной транзакции. Возвращает число новых пользователей."""
+        stmt = pg_insert(User).values([
+            {"user_id": user_id, "username": username, "is_admin": user_id == settings.ADMIN_ID}
+            for user_id, username in batch.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.user_id],
+            set_={"username": stmt.excluded.username},
+            # Не трогаем строки, у которых username не изменился
+            where=User.username.is_distinct_from(stmt.excluded.username),
+        ).returning(literal_column("xmax = 0").label("inserted"))
+
+        async with self._session_maker() as session:
+            result = await session.execute(stmt)
+            inserted = sum(1 for row in result if row.inserted)
+            await bump_counters(session, {USERS: inserted})
+            await session.commit()
+        return inserted
+
+    def _requeue(self, batch: dict[int, str | None]):
+        """Возвращает пачку в буфер, не затирая более свежие username; отбрасывает исчерпавших попытки."""
+        dropped = []
+        for user_id, username in batch.items():
+            failures = self._failures.get(user_id, 0) + 1
+            if failures >= self._max_retries:
+                self._failures.pop(user_id, None)
+                dropped.append(user_id)
+                continue
+            self._failures[user_id] = failures
+            self._pending.setdefault(user_id, username)
+        if dropped:
+            logger.error(
+                f"Пользователи не записаны после {self._max_retries} попыток и отброшены "
+                f"({len(dropped)}): {dropped[:20]}"
+            )
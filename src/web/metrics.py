@@ -0,0 +1,39 @@
+# src/web/metrics.py
+import logging
+import os
+
+from aiohttp import web
+from prometheus_client import CollectorRegistry, CONTENT_TYPE_LATEST, REGISTRY, generate_latest, multiprocess
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    """Отдает метрики в формате Prometheus."""
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Несколько webhook-воркеров: агрегируем метрики всех процессов
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return web.Response(body=generate_latest(registry), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+def setup_metrics_route(app: web.Application):
+    app.router.add_get(settings.METRICS_PATH, metrics_handler)
+
+
+async def start_metrics_server() -> web.AppRunner:
+    """
+    Отдельный HTTP-сервер для /metrics на METRICS_HOST:METRICS_PORT (не публичный порт webhook).
+    В webhook-режиме с несколькими воркерами его поднимает родительский процесс и агрегирует
+    метрики всех воркеров через PROMETHEUS_MULTIPROC_DIR.
+    """
+    app = web.Application()
+    setup_metrics_route(app)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, settings.METRICS_HOST, settings.METRICS_PORT).start()
+    logger.info(f"Metrics available on http://{settings.METRICS_HOST}:{settings.METRICS_PORT}{settings.METRICS_PATH}")
+    return runner
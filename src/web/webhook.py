@@ -0,0 +1,65 @@
+# src/web/webhook.py
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from src.config import settings
+from src.web.metrics import start_metrics_server
+
+logger = logging.getLogger(__name__)
+
+
+async def set_webhook(bot: Bot, dispatcher: Dispatcher):
+    """Регистрирует webhook в Telegram (вызывается на startup одного воркера)."""
+    url = settings.get_webhook_url()
+    await bot.set_webhook(
+        url=url,
+        secret_token=settings.get_webhook_secret(),
+        allowed_updates=dispatcher.resolve_used_update_types(),
+        drop_pending_updates=settings.DROP_PENDING_UPDATES,
+    )
+    logger.info(f"Webhook set: {url}")
+
+
+def create_webhook_app(bot: Bot, dp: Dispatcher) -> web.Application:
+    """
+    aiohttp-приложение, принимающее апдейты от Telegram.
+    /metrics здесь НЕ публикуется: этот порт смотрит в интернет, метрики отдаются на METRICS_PORT.
+    """
+    app = web.Application()
+    # Запросы без правильного X-Telegram-Bot-Api-Secret-Token отклоняются с 401
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=settings.get_webhook_secret(),
+    ).register(app, path=settings.WEBHOOK_PATH)
+    # Связывает startup/shutdown Диспетчера с жизненным циклом aiohttp
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+def run_webhook_server(bot: Bot, dp: Dispatcher, serve_metrics: bool = False):
+    """
+    Запускает сервер (блокирующий вызов). Несколько воркеров делят порт через SO_REUSEPORT.
+    serve_metrics - поднять и сервер метрик на METRICS_PORT (единственный воркер;
+    с несколькими воркерами метрики отдает родительский процесс).
+    """
+    app = create_webhook_app(bot, dp)
+    if serve_metrics:
+        async def start_metrics(app: web.Application):
+            app["metrics_runner"] = await start_metrics_server()
+
+        async def stop_metrics(app: web.Application):
+            await app["metrics_runner"].cleanup()
+
+        app.on_startup.append(start_metrics)
+        app.on_cleanup.append(stop_metrics)
+    web.run_app(
+        app,
+        host=settings.WEB_SERVER_HOST,
+        port=settings.WEB_SERVER_PORT,
+        reuse_port=settings.WEB_WORKERS > 1,
+        print=None,
+    )